@@ -0,0 +1,437 @@
+"""Offline benchmarks for the community client
+Run them from this directory with 'python benchmark.py <benchmark>'; none of them need a window or OpenGL context"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import glm
+import nbtlib as nbt
+import numpy as np
+import pyglet
+
+pyglet.options["shadow_window"] = False
+
+import chunk
+import options
+import vertex_format
+import world
+from paletted_storage import Paletted_storage
+
+# block numbers (see 'data/blocks.mcpy') and sea level of the synthetic terrain
+
+STONE = 1
+GRASS = 2
+DIRT = 3
+WATER = 8
+SAND = 12
+YELLOW_FLOWER = 37
+RED_ROSE = 38
+TORCH = 50
+
+SEA_LEVEL = 62
+
+
+def load_saved_blocks(save_path):
+	"""Yields the position and raw block data of every chunk file in a save directory"""
+
+	for chunk_path in sorted(glob.glob(os.path.join(save_path, "**", "*.dat"), recursive=True)):
+		level = nbt.load(chunk_path)["Level"]
+		yield glm.ivec3(level["xPos"], 0, level["zPos"]), level["Blocks"].tobytes()
+
+
+def generate_blocks(size, seed):
+	"""Yields the position and raw block data of a square of 'size' by 'size' chunks of synthetic terrain: rolling hills
+	of stone, dirt and grass, with sand and water around sea level, and flowers and torches scattered over the grass"""
+
+	rng = np.random.default_rng(seed)
+
+	x, z = np.meshgrid(np.arange(size * chunk.CHUNK_WIDTH), np.arange(size * chunk.CHUNK_LENGTH), indexing="ij")
+	heights = (60 + 8 * np.sin(x / 11) + 6 * np.cos(z / 17) + 3 * np.sin((x + z) / 5)).astype(np.int64)
+
+	decorations = rng.choice((0, YELLOW_FLOWER, RED_ROSE, TORCH), size=heights.shape, p=(0.9, 0.04, 0.04, 0.02))
+	decorations[heights <= SEA_LEVEL + 1] = 0
+
+	# columns of blocks, laid out (x, z, y) like the chunks' own arrays
+
+	y = np.arange(chunk.CHUNK_HEIGHT)
+	heights = heights[..., np.newaxis]
+
+	columns = np.select(
+		(
+			(y <= heights) & (y >= heights - 2) & (heights <= SEA_LEVEL + 1),
+			y < heights - 2,
+			y < heights,
+			y == heights,
+			y <= SEA_LEVEL,
+			y == heights + 1,
+		),
+		(SAND, STONE, DIRT, GRASS, WATER, decorations[..., np.newaxis]),
+		0,
+	).astype(np.uint8)
+
+	for chunk_x in range(size):
+		for chunk_z in range(size):
+			yield (
+				glm.ivec3(chunk_x, 0, chunk_z),
+				columns[
+					chunk_x * chunk.CHUNK_WIDTH : (chunk_x + 1) * chunk.CHUNK_WIDTH,
+					chunk_z * chunk.CHUNK_LENGTH : (chunk_z + 1) * chunk.CHUNK_LENGTH,
+				].tobytes(),
+			)
+
+
+def load_blocks(args):
+	"""Position and raw block data of the chunks to benchmark with, from the save directory or synthetic terrain"""
+
+	if args.synthetic:
+		# enough chunks for the meshing benchmark, along with a border of chunks around them
+
+		return list(generate_blocks(math.isqrt(args.chunks - 1) + 3, args.seed))
+
+	saved_blocks = list(load_saved_blocks(args.save))
+
+	if not saved_blocks:
+		raise SystemExit(f"No chunks found in '{args.save}'")
+
+	return saved_blocks
+
+
+def get_source_name(args):
+	return "synthetic terrain" if args.synthetic else f"'{args.save}'"
+
+
+def nested_list_storage(blocks):
+	# block layout used by chunks before the flat byte arrays
+
+	return [
+		[
+			[blocks[(x * chunk.CHUNK_LENGTH + z) * chunk.CHUNK_HEIGHT + y] for z in range(chunk.CHUNK_LENGTH)]
+			for y in range(chunk.CHUNK_HEIGHT)
+		]
+		for x in range(chunk.CHUNK_WIDTH)
+	]
+
+
+def flat_storage(blocks):
+	return bytearray(blocks)
+
+
+def paletted_storage(blocks):
+	storage = Paletted_storage(chunk.CHUNK_WIDTH * chunk.CHUNK_LENGTH, chunk.CHUNK_HEIGHT)
+	storage[:] = blocks
+	return storage
+
+
+def read_nested_list(storage, positions):
+	for x, y, z in positions:
+		storage[x][y][z]
+
+
+def read_indexed(storage, positions):
+	for position in positions:
+		storage[chunk.get_block_index(position)]
+
+
+def benchmark_storage(args):
+	"""Memory used per chunk by each block storage layout, as well as their random read throughput"""
+
+	saved_blocks = [blocks for _, blocks in load_blocks(args)]
+
+	layouts = (
+		("Nested lists", nested_list_storage, read_nested_list),
+		("Flat byte array", flat_storage, read_indexed),
+		("Paletted", paletted_storage, read_indexed),
+	)
+
+	positions = [
+		(
+			random.randrange(chunk.CHUNK_WIDTH),
+			random.randrange(chunk.CHUNK_HEIGHT),
+			random.randrange(chunk.CHUNK_LENGTH),
+		)
+		for _ in range(args.reads)
+	]
+
+	print(f"{len(saved_blocks)} chunks from {get_source_name(args)}")
+
+	for name, create_storage, read in layouts:
+		tracemalloc.start()
+		storages = [create_storage(blocks) for blocks in saved_blocks]
+		memory, _ = tracemalloc.get_traced_memory()
+		tracemalloc.stop()
+
+		start = time.perf_counter()
+		read(storages[0], positions)
+		reads_per_second = len(positions) / (time.perf_counter() - start)
+
+		print(
+			f"{name:>16}: {memory / len(storages) / 1024:9.1f} KiB/chunk "
+			f"({memory / 1048576:7.2f} MiB total), {reads_per_second / 1e6:5.2f} M reads/s"
+		)
+
+
+class Block_data:
+	# stand-in for a chunk with nothing but its blocks, which is all the world's block lookups need
+
+	def __init__(self, chunk_position, blocks):
+		self.chunk_position = chunk_position
+		self.blocks = bytearray(blocks)
+
+
+def glm_get_block_number(lookup_world, position):
+	# block lookup as it was done before the packed chunk keys, through the 'glm.ivec3' positions
+
+	chunk_data = lookup_world.chunks.get(world.get_chunk_position(position), None)
+	if not chunk_data:
+		return 0
+
+	return chunk_data.blocks[chunk.get_block_index(world.get_local_position(position))]
+
+
+class Lookup_world(world.World):
+	# the actual world constructor needs an OpenGL context, so only set up what block lookups need
+
+	def __init__(self):
+		self.chunks = {}
+		self.chunk_keys = {}
+		self.last_chunk_key = None
+		self.last_chunk = None
+
+	def __del__(self):
+		pass
+
+
+def benchmark_lookups(args):
+	"""Block lookups per second through the 'glm.ivec3' chunk positions and through the packed chunk keys"""
+
+	lookup_world = Lookup_world()
+
+	for chunk_position, blocks in load_blocks(args):
+		lookup_world.add_chunk(Block_data(chunk_position, blocks))
+
+	min_x = min(chunk_position.x for chunk_position in lookup_world.chunks) * chunk.CHUNK_WIDTH
+	max_x = (max(chunk_position.x for chunk_position in lookup_world.chunks) + 1) * chunk.CHUNK_WIDTH
+	min_z = min(chunk_position.z for chunk_position in lookup_world.chunks) * chunk.CHUNK_LENGTH
+	max_z = (max(chunk_position.z for chunk_position in lookup_world.chunks) + 1) * chunk.CHUNK_LENGTH
+
+	# random positions all over the world, and the 3x3x3 neighbourhoods the mesher and the lighting engine look at
+
+	random_positions = [
+		glm.ivec3(random.randrange(min_x, max_x), random.randrange(chunk.CHUNK_HEIGHT), random.randrange(min_z, max_z))
+		for _ in range(args.reads)
+	]
+
+	neighbourhood_positions = [
+		position + glm.ivec3(x, y, z)
+		for position in random_positions[: args.reads // 27]
+		for x in (-1, 0, 1)
+		for y in (-1, 0, 1)
+		for z in (-1, 0, 1)
+	]
+
+	for name, positions in (("Random", random_positions), ("Neighbourhoods", neighbourhood_positions)):
+		for path, get_block_number in (
+			("glm.ivec3", glm_get_block_number),
+			("packed keys", world.World.get_block_number),
+		):
+			start = time.perf_counter()
+
+			for position in positions:
+				get_block_number(lookup_world, position)
+
+			lookups_per_second = len(positions) / (time.perf_counter() - start)
+			print(f"{name:>14} ({path:>11}): {lookups_per_second / 1e6:5.2f} M lookups/s")
+
+
+class Texture_names:
+	# stand-in for the texture manager, which needs an OpenGL context, when all we need are texture indices
+
+	def __init__(self):
+		self.textures = []
+
+	def add_texture(self, texture):
+		if texture not in self.textures:
+			self.textures.append(texture)
+
+
+class Mesh_world(world.World):
+	# only set up the block types and the chunk lookups, which is all that meshing needs
+
+	def __init__(self):
+		self.options = options
+		self.texture_manager = Texture_names()
+		self.block_types = [None]
+		self.load_block_types()
+
+		self.chunks = {}
+		self.chunk_keys = {}
+		self.last_chunk_key = None
+		self.last_chunk = None
+
+		self.uploaded_bytes = 0
+
+	def __del__(self):
+		pass
+
+
+class Mesh_chunk(chunk.Chunk):
+	# chunk without any of the OpenGL objects, which builds its vertex data as usual but doesn't upload it
+
+	def create_buffers(self):
+		pass
+
+	def __del__(self):
+		pass
+
+	def send_mesh_data_to_gpu(self):
+		for mesh in (self.mesh, self.translucent_mesh):
+			_, size = self.get_vertex_data(mesh)
+			self.world.uploaded_bytes += size
+
+
+def benchmark_meshing(args):
+	"""Subchunks and faces meshed per second, and bytes of vertex data emitted, by the subchunk mesher
+	('Subchunk.update_mesh'), by the chunks combining the resulting meshes ('Chunk.update_mesh'),
+	and by the vectorized mesher, with ambient occlusion (smooth lighting) off and on"""
+
+	options.INCREMENTAL_UPLOADS = False  # uploads subchunk meshes as it goes, which needs the OpenGL objects
+
+	mesh_world = Mesh_world()
+
+	for chunk_position, blocks in load_blocks(args):
+		mesh_chunk = Mesh_chunk(mesh_world, chunk_position)
+		mesh_chunk.set_blocks(blocks)
+		mesh_world.add_chunk(mesh_chunk)
+
+	# don't mesh the chunks at the edge of the world, which would have lots of faces no one ever sees
+
+	chunks = [
+		mesh_chunk
+		for mesh_chunk in mesh_world.chunks.values()
+		if all(
+			mesh_world.chunks.get(mesh_chunk.chunk_position + glm.ivec3(x, 0, z), None)
+			for x in (-1, 0, 1)
+			for z in (-1, 0, 1)
+		)
+	][: args.chunks]
+
+	# each of these returns the number of subchunks meshed, the number of faces they have and of quads they make up
+
+	def subchunk_meshing():
+		face_count = 0
+		subchunk_count = 0
+
+		for mesh_chunk in chunks:
+			for subchunk in mesh_chunk.subchunks.values():
+				subchunk.update_mesh()
+				face_count += subchunk.face_count
+				subchunk_count += 1
+
+		return subchunk_count, face_count, face_count
+
+	def chunk_meshing():
+		# combines the subchunk meshes left over from 'subchunk_meshing'
+
+		for mesh_chunk in chunks:
+			mesh_chunk.update_mesh()
+
+		return (
+			sum(len(mesh_chunk.subchunks) for mesh_chunk in chunks),
+			sum(mesh_chunk.face_count for mesh_chunk in chunks),
+			sum(mesh_chunk.mesh_quad_count + mesh_chunk.translucent_quad_count for mesh_chunk in chunks),
+		)
+
+	def vectorized_meshing(greedy=False):
+		face_count = 0
+		quad_count = 0
+		subchunk_count = 0
+
+		for mesh_chunk in chunks:
+			snapshot = mesh_world.get_chunk_snapshot(mesh_chunk.chunk_position)
+			meshes = mesh_world.mesher.mesh_subchunks(
+				snapshot, list(mesh_chunk.subchunks), greedy, options.SMOOTH_LIGHTING
+			)
+
+			for mesh, translucent_mesh, subchunk_face_count in meshes.values():
+				face_count += subchunk_face_count
+				quad_count += (len(mesh) + len(translucent_mesh)) // 28
+				subchunk_count += 1
+
+		return subchunk_count, face_count, quad_count
+
+	results = []
+
+	for smooth_lighting in (False, True):
+		options.SMOOTH_LIGHTING = smooth_lighting
+
+		for name, mesh in (
+			("subchunk", subchunk_meshing),
+			("chunk", chunk_meshing),
+			("vectorized", vectorized_meshing),
+			("greedy", lambda: vectorized_meshing(greedy=True)),
+		):
+			start = time.perf_counter()
+			subchunk_count, face_count, quad_count = mesh()
+			elapsed = time.perf_counter() - start
+
+			results.append(
+				{
+					"mesher": name,
+					"ao": smooth_lighting,
+					"seconds": elapsed,
+					"subchunks": subchunk_count,
+					"faces": face_count,
+					"quads": quad_count,
+					"bytes": quad_count * 4 * vertex_format.get_vertex_bytes(options),
+					"subchunks_per_second": subchunk_count / elapsed,
+					"faces_per_second": face_count / elapsed,
+				}
+			)
+
+	if args.json:
+		report = {"benchmark": "meshing", "source": get_source_name(args), "chunks": len(chunks), "results": results}
+		json.dump(report, sys.stdout, indent="\t")
+		print()
+		return
+
+	print(f"{len(chunks)} chunks from {get_source_name(args)}")
+
+	for result in results:
+		print(
+			f"{result['mesher']:>10} (AO {'on' if result['ao'] else 'off':>3}): "
+			f"{result['faces']} faces in {result['quads']:6} quads ({result['bytes'] / 1048576:5.2f} MiB), "
+			f"{result['seconds']:6.2f} s, {result['subchunks_per_second'] / 1e3:6.2f} k subchunks/s, "
+			f"{result['faces_per_second'] / 1e3:8.1f} k faces/s"
+		)
+
+
+BENCHMARKS = {
+	"storage": benchmark_storage,
+	"lookups": benchmark_lookups,
+	"meshing": benchmark_meshing,
+}
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("benchmark", choices=BENCHMARKS)
+	parser.add_argument("--save", default="save", help="save directory to take the chunks from")
+	parser.add_argument("--reads", type=int, default=1000000, help="number of block reads/lookups to time")
+	parser.add_argument("--chunks", type=int, default=16, help="number of chunks to mesh")
+	parser.add_argument("--synthetic", action="store_true", help="use synthetic terrain rather than a save")
+	parser.add_argument("--seed", type=int, default=0, help="random seed of the synthetic terrain")
+	parser.add_argument("--json", action="store_true", help="print the results as JSON (meshing only)")
+	args = parser.parse_args()
+
+	BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+	main()
@@ -1,3 +1,5 @@
+import numpy as np
+
 import collider
 
 import models.cube  # default model
@@ -67,3 +69,14 @@ class Block_type:
 
 			else:
 				set_block_face(["right", "left", "top", "bottom", "front", "back"].index(face), texture_index)
+
+		# vertices of the whole model, laid out like in chunk meshes (with no light), so that a block which isn't
+		# a cube can be meshed at once by copying them over, moved to its position and lit with its light levels
+
+		self.vertex_template = np.array(
+			[
+				(*self.vertex_positions[face][i * 3 : i * 3 + 3], self.tex_indices[face] * 4 + i, shading, 0, 0)
+				for face in range(len(self.vertex_positions))
+				for i, shading in enumerate(self.shading_values[face])
+			]
+		)
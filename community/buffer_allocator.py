@@ -0,0 +1,85 @@
+import bisect
+
+# Suballocation of ranges inside a larger buffer, so that parts of its contents can be replaced independently
+# Units are up to the user (quads, vertices, bytes, ...), the allocator only ever deals with offsets and sizes
+
+
+class Buffer_allocator:
+	"""First-fit allocator of ranges in a buffer of 'capacity' units
+	Free ranges are kept sorted by offset and merged with their neighbours as they're freed"""
+
+	def __init__(self, capacity):
+		self.reset(capacity)
+
+	def reset(self, capacity):
+		self.capacity = capacity
+		self.used = 0
+
+		self.free_offsets = [0]
+		self.free_sizes = [capacity]
+
+	def allocate(self, size):
+		"""Offset of a new range of 'size' units, None if there's no free range large enough"""
+
+		for i, free_size in enumerate(self.free_sizes):
+			if free_size < size:
+				continue
+
+			offset = self.free_offsets[i]
+
+			if free_size == size:
+				del self.free_offsets[i]
+				del self.free_sizes[i]
+			else:
+				self.free_offsets[i] += size
+				self.free_sizes[i] -= size
+
+			self.used += size
+			return offset
+
+		return None
+
+	def free(self, offset, size):
+		i = bisect.bisect(self.free_offsets, offset)
+		self.used -= size
+
+		# merge with the free range right after, and then with the one right before
+
+		if i < len(self.free_offsets) and offset + size == self.free_offsets[i]:
+			size += self.free_sizes[i]
+			del self.free_offsets[i]
+			del self.free_sizes[i]
+
+		if i and self.free_offsets[i - 1] + self.free_sizes[i - 1] == offset:
+			self.free_sizes[i - 1] += size
+			return
+
+		self.free_offsets.insert(i, offset)
+		self.free_sizes.insert(i, size)
+
+	def grow(self, capacity):
+		# make room for 'capacity' units in all, the new space being free
+
+		extra = capacity - self.capacity
+
+		if self.free_offsets and self.free_offsets[-1] + self.free_sizes[-1] == self.capacity:
+			self.free_sizes[-1] += extra
+		else:
+			self.free_offsets.append(self.capacity)
+			self.free_sizes.append(extra)
+
+		self.capacity = capacity
+
+	def get_end(self):
+		# end of the last allocated range
+
+		if self.free_offsets and self.free_offsets[-1] + self.free_sizes[-1] == self.capacity:
+			return self.free_offsets[-1]
+
+		return self.capacity
+
+	def get_fragmentation(self):
+		# share of the space up to the last allocated range which isn't in use
+
+		end = self.get_end()
+		return 1 - self.used / end if end else 0
@@ -0,0 +1,58 @@
+import pyglet.gl as gl
+
+# Pool of the buffers chunk meshes are uploaded to, sized to fit them rather than to fit the largest possible mesh
+# Sizes are rounded up to powers of two (size classes), so that buffers released when meshes grow or shrink can be
+# handed out again to other chunks, instead of being deleted and created over and over
+
+MIN_BUFFER_SIZE = 1 << 12  # 4 KiB
+MAX_FREE_BUFFERS = 16  # per size class, past which released buffers are deleted
+
+
+def get_size_class(size):
+	return max(MIN_BUFFER_SIZE, 1 << (size - 1).bit_length())
+
+
+class Buffer_pool:
+	def __init__(self):
+		self.free_buffers = {}  # size class: buffers of that size which aren't in use
+
+		self.size = 0  # bytes taken by all the buffers of the pool, in use or not
+		self.used_size = 0
+
+	def delete(self):
+		for buffers in self.free_buffers.values():
+			for buffer in buffers:
+				gl.glDeleteBuffers(1, buffer)
+
+		self.free_buffers.clear()
+
+	def acquire(self, size):
+		"""Buffer of at least 'size' bytes, along with its actual size
+		Its contents are undefined, whether it's a new buffer or one released earlier"""
+
+		size = get_size_class(size)
+		free_buffers = self.free_buffers.get(size)
+
+		if free_buffers:
+			buffer = free_buffers.pop()
+		else:
+			buffer = gl.GLuint(0)
+			gl.glGenBuffers(1, buffer)
+			gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, buffer)
+			gl.glBufferData(gl.GL_COPY_WRITE_BUFFER, size, None, gl.GL_DYNAMIC_DRAW)
+
+			self.size += size
+
+		self.used_size += size
+		return buffer, size
+
+	def release(self, buffer, size):
+		self.used_size -= size
+		free_buffers = self.free_buffers.setdefault(size, [])
+
+		if len(free_buffers) < MAX_FREE_BUFFERS:
+			free_buffers.append(buffer)
+			return
+
+		gl.glDeleteBuffers(1, buffer)
+		self.size -= size
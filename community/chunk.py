@@ -1,9 +1,17 @@
 import ctypes
 from collections import deque
 
+import numpy as np
 import pyglet.gl as gl
 
 from subchunk import SUBCHUNK_WIDTH, SUBCHUNK_HEIGHT, SUBCHUNK_LENGTH, Subchunk
+from buffer_allocator import Buffer_allocator
+import buffer_pool
+import index_buffer
+from index_buffer import QUAD_INDICES
+from paletted_storage import Paletted_storage
+import mesh_workers
+import vertex_format
 
 import options
 
@@ -11,11 +19,63 @@ CHUNK_WIDTH = 16
 CHUNK_HEIGHT = 128
 CHUNK_LENGTH = 16
 
+# chunks are also cut vertically into sections, which keep track of how many non-air blocks they contain
+# and whether they're made entirely of one block, so that empty or uniform parts of the chunk can be skipped
+
+SECTION_HEIGHT = 16
+SECTION_COUNT = CHUNK_HEIGHT // SECTION_HEIGHT
+
+ALL_SECTIONS = (1 << SECTION_COUNT) - 1  # bit mask of the sections of a chunk which are visible
+
+# with incremental uploads, the subchunk ranges of a chunk's VBO are packed back together when more than this share
+# of the space they span is left unused
+
+COMPACTION_THRESHOLD = 0.5
+
+# block numbers and light levels are stored in flat byte arrays (one byte per block)
+# the stride is the same as the one used by the save files; Y varies fastest, then Z, then X
+
+
+def get_block_index(position):
+	x, y, z = position
+	return (x * CHUNK_LENGTH + z) * CHUNK_HEIGHT + y
+
+
+def get_block_position(index):
+	xz, y = divmod(index, CHUNK_HEIGHT)
+	x, z = divmod(xz, CHUNK_LENGTH)
+	return x, y, z
+
+
+# meshes are kept as buffers of 32-bit floats (arrays from the subchunk mesher, numpy arrays from the vectorized one),
+# and only ever copied as whole buffers, never float by float
+
+
+def concatenate_meshes(meshes):
+	return np.concatenate([np.empty(0, dtype=np.float32), *(np.frombuffer(mesh, dtype=np.float32) for mesh in meshes)])
+
+
+def get_subchunk_section(subchunk):
+	return subchunk.subchunk_position[1] * SUBCHUNK_HEIGHT // SECTION_HEIGHT
+
+
+def merge_draw_ranges(draw_ranges):
+	# join the draw ranges (index counts and base vertices) which follow each other in the VBO
+
+	merged_ranges = []
+
+	for index_count, base_vertex in draw_ranges:
+		if merged_ranges and merged_ranges[-1][1] + merged_ranges[-1][0] // 6 * 4 == base_vertex:
+			merged_ranges[-1] = (merged_ranges[-1][0] + index_count, merged_ranges[-1][1])
+		else:
+			merged_ranges.append((index_count, base_vertex))
+
+	return merged_ranges
+
 
 class Chunk:
 	def __init__(self, world, chunk_position):
 		self.world = world
-		self.shader_chunk_offset_location = self.world.shader.find_uniform(b"u_ChunkPosition")
 
 		self.modified = False
 		self.chunk_position = chunk_position
@@ -26,13 +86,29 @@ class Chunk:
 			self.chunk_position[2] * CHUNK_LENGTH,
 		)
 
-		self.blocks = [[[0 for z in range(CHUNK_LENGTH)] for y in range(CHUNK_HEIGHT)] for x in range(CHUNK_WIDTH)]
-		# Numpy is really slow there
-		self.lightmap = [[[0 for z in range(CHUNK_LENGTH)] for y in range(CHUNK_HEIGHT)] for x in range(CHUNK_WIDTH)]
+		if self.world.options.PALETTED_STORAGE:
+			self.blocks = Paletted_storage(CHUNK_WIDTH * CHUNK_LENGTH, CHUNK_HEIGHT, SECTION_HEIGHT)
+		else:
+			self.blocks = bytearray(CHUNK_WIDTH * CHUNK_HEIGHT * CHUNK_LENGTH)
+
+		self.lightmap = bytearray(CHUNK_WIDTH * CHUNK_HEIGHT * CHUNK_LENGTH)
+
+		self.section_block_counts = [0] * SECTION_COUNT  # number of non-air blocks in each section
+		self.uniform_sections = [0] * SECTION_COUNT  # block number filling each section, None if it's mixed
+
+		# for each column, the height just above its highest non-air/opaque block (0 if there's none)
+
+		self.heightmap = bytearray(CHUNK_WIDTH * CHUNK_LENGTH)
+		self.opaque_heightmap = bytearray(CHUNK_WIDTH * CHUNK_LENGTH)
 
 		self.subchunks = {}
 		self.chunk_update_queue = deque()
 
+		self.mesh_job = None  # future of the subchunks being meshed by the mesh workers, if any
+		self.mesh_job_subchunks = []
+
+		self.updated_subchunks = {}  # subchunks with a new mesh to upload, in order (the values are unused)
+
 		for x in range(int(CHUNK_WIDTH / SUBCHUNK_WIDTH)):
 			for y in range(int(CHUNK_HEIGHT / SUBCHUNK_HEIGHT)):
 				for z in range(int(CHUNK_LENGTH / SUBCHUNK_LENGTH)):
@@ -40,48 +116,79 @@ class Chunk:
 
 		# mesh variables
 
-		self.mesh = []
-		self.translucent_mesh = []
+		self.mesh = np.empty(0, dtype=np.float32)
+		self.translucent_mesh = np.empty(0, dtype=np.float32)
 
 		self.mesh_quad_count = 0
 		self.translucent_quad_count = 0
+		self.face_count = 0  # number of block faces the meshes cover, which is more than their quads if merged
+		self.index_type = gl.GL_UNSIGNED_SHORT  # type of the shared indices its draws use (see 'Index_buffer')
+		self.lod = 0  # level of detail the chunk is meshed at, 0 being full detail (see 'World.update_chunk_lods')
+
+		# the opaque quads of each section have draw ranges of their own, so that only those of the sections which are
+		# in the frustum are drawn (see 'Chunk_culler'); draw ranges are index counts and base vertices, relative to
+		# the chunk's first vertex, in the order they're drawn in
 
+		self.section_draw_ranges = []  # section, index count, base vertex
+		self.visible_sections = ALL_SECTIONS
+		self.visible_draw_ranges = None  # draw ranges of the visible sections, None if they all are
+		self.visible_draw_arguments = None  # same, as arguments of a multi-draw call
+
+		# with incremental uploads, every subchunk has its own range of the VBO (its opaque quads, then its
+		# translucent quads), and the chunk is drawn by drawing each of these ranges
+
+		self.subchunk_ranges = {}  # subchunk: (offset, quad count, translucent quad count), all in quads
+		self.draw_ranges = None
+		self.translucent_draw_ranges = None
+
+		# with fancy translucency, translucent quads are drawn back to front, through indices of their own which are
+		# sorted again whenever the chunk is remeshed or the camera moves to another block
+
+		self.translucent_centroids = None  # centre of each translucent quad, in world coordinates
+		self.translucent_first_vertices = None  # index of the first vertex of each translucent quad in the VBO
+		self.translucent_sort_block = None  # block the camera was in when the quads were last sorted
+
+		# with the world buffer, the chunk has no buffers of its own, but a range of the world buffer (its opaque
+		# quads, then its translucent quads), along with one of its sorted translucent indices with fancy translucency
+
+		self.world_buffer_offset = None  # in quads, None if the chunk has no range
+		self.world_buffer_quad_count = 0
+		self.translucent_index_offset = None
+		self.translucent_index_quad_count = 0
+
+		self.create_buffers()
+
+	def create_buffers(self):
 		# create VAO and VBO's
 
+		self.shader_chunk_offset_location = self.world.shader.find_uniform(b"u_ChunkPosition")
+
+		if self.world.world_buffer:
+			self.vbo = self.world.world_buffer.vertices.buffer
+			return
+
 		self.vao = gl.GLuint(0)
 		gl.glGenVertexArrays(1, self.vao)
 		gl.glBindVertexArray(self.vao)
 
-		self.vbo = gl.GLuint(0)
-		gl.glGenBuffers(1, self.vbo)
-		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
-		gl.glBufferData(
-			gl.GL_ARRAY_BUFFER,
-			ctypes.sizeof(gl.GLfloat * CHUNK_WIDTH * CHUNK_HEIGHT * CHUNK_LENGTH * 7),
-			None,
-			gl.GL_DYNAMIC_DRAW,
-		)
+		# the VBO comes from the world's buffer pool, sized to fit the meshes, so there's none until there are any
 
-		gl.glVertexAttribPointer(0, 3, gl.GL_FLOAT, gl.GL_FALSE, 7 * ctypes.sizeof(gl.GLfloat), 0)
-		gl.glEnableVertexAttribArray(0)
-		gl.glVertexAttribPointer(
-			1, 1, gl.GL_FLOAT, gl.GL_FALSE, 7 * ctypes.sizeof(gl.GLfloat), 3 * ctypes.sizeof(gl.GLfloat)
-		)
-		gl.glEnableVertexAttribArray(1)
-		gl.glVertexAttribPointer(
-			2, 1, gl.GL_FLOAT, gl.GL_FALSE, 7 * ctypes.sizeof(gl.GLfloat), 4 * ctypes.sizeof(gl.GLfloat)
-		)
-		gl.glEnableVertexAttribArray(2)
-		gl.glVertexAttribPointer(
-			3, 1, gl.GL_FLOAT, gl.GL_FALSE, 7 * ctypes.sizeof(gl.GLfloat), 5 * ctypes.sizeof(gl.GLfloat)
-		)
-		gl.glEnableVertexAttribArray(3)
-		gl.glVertexAttribPointer(
-			4, 1, gl.GL_FLOAT, gl.GL_FALSE, 7 * ctypes.sizeof(gl.GLfloat), 6 * ctypes.sizeof(gl.GLfloat)
-		)
-		gl.glEnableVertexAttribArray(4)
+		self.vbo = None
+		self.vbo_size = 0
+		self.allocator = Buffer_allocator(0)
+
+		gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.world.index_buffer.buffer)
+
+		if self.world.options.FANCY_TRANSLUCENCY:
+			# same vertices, but with the sorted translucent indices as the IBO
+
+			self.translucent_ibo = gl.GLuint(0)
+			gl.glGenBuffers(1, self.translucent_ibo)
 
-		gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, world.ibo)
+			self.translucent_vao = gl.GLuint(0)
+			gl.glGenVertexArrays(1, self.translucent_vao)
+			gl.glBindVertexArray(self.translucent_vao)
+			gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.translucent_ibo)
 
 		if self.world.options.INDIRECT_RENDERING:
 			self.indirect_command_buffer = gl.GLuint(0)
@@ -94,55 +201,231 @@ class Chunk:
 		self.occlusion_query = gl.GLuint(0)
 		gl.glGenQueries(1, self.occlusion_query)
 
+	def resize_vbo(self, size):
+		# make sure the VBO can hold 'size' bytes, swapping it for one from the pool if it's too small,
+		# or if it's more than twice as large as it needs to be
+
+		if size <= self.vbo_size and buffer_pool.get_size_class(size) * 2 >= self.vbo_size:
+			return
+
+		self.release_vbo()
+		self.vbo, self.vbo_size = self.world.buffer_pool.acquire(size)
+
+		# VAOs keep track of the buffer their attributes are read from, so point them to the new one
+
+		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+
+		for vao in (self.vao, self.translucent_vao) if self.world.options.FANCY_TRANSLUCENCY else (self.vao,):
+			gl.glBindVertexArray(vao)
+			vertex_format.set_vertex_attributes(self.world.options)
+
+	def release_vbo(self):
+		if self.vbo is None:
+			return
+
+		self.world.buffer_pool.release(self.vbo, self.vbo_size)
+		self.vbo = None
+		self.vbo_size = 0
+
+	def get_vertex_data(self, mesh):
+		# vertex data of a mesh in the format the VBO expects, along with its size in bytes
+
+		if self.world.options.PACKED_VERTICES:
+			data = vertex_format.pack_vertices(mesh)
+			return data, len(data)
+
+		mesh = np.frombuffer(mesh, dtype=np.float32)
+		return mesh.ctypes.data_as(ctypes.c_void_p), mesh.nbytes
+
+	def upload_vertex_data(self, offset, mesh):
+		# write the vertex data of a mesh to the VBO (bound to GL_ARRAY_BUFFER) at 'offset' bytes, through the world's
+		# staging buffer if it has one, and return its size in bytes
+
+		if self.world.staging_buffer:
+			if self.world.options.PACKED_VERTICES:
+				values, dtype = np.frombuffer(vertex_format.pack_vertices(mesh), np.uint8), np.uint8
+			else:
+				values, dtype = np.frombuffer(mesh, dtype=np.float32), np.float32
+
+			size = self.world.staging_buffer.upload(self.vbo, offset, values, dtype)
+
+			if size is not None:
+				return size
+
+		data, size = self.get_vertex_data(mesh)
+		gl.glBufferSubData(gl.GL_ARRAY_BUFFER, offset, size, data)
+
+		return size
+
 	def __del__(self):
+		if self.world.world_buffer:
+			self.free_world_buffer_ranges()
+			return
+
 		gl.glDeleteQueries(1, self.occlusion_query)
-		gl.glDeleteBuffers(1, self.vbo)
 		gl.glDeleteVertexArrays(1, self.vao)
+		self.release_vbo()
+
+		if self.world.options.FANCY_TRANSLUCENCY:
+			gl.glDeleteBuffers(1, self.translucent_ibo)
+			gl.glDeleteVertexArrays(1, self.translucent_vao)
 
 	def get_block_light(self, position):
 		x, y, z = position
-		return self.lightmap[x][y][z] & 0xF
+		return self.lightmap[(x * CHUNK_LENGTH + z) * CHUNK_HEIGHT + y] & 0xF
 
 	def set_block_light(self, position, value):
 		x, y, z = position
-		self.lightmap[x][y][z] = (self.lightmap[x][y][z] & 0xF0) | value
+		index = (x * CHUNK_LENGTH + z) * CHUNK_HEIGHT + y
+		self.lightmap[index] = (self.lightmap[index] & 0xF0) | value
 
 	def get_sky_light(self, position):
 		x, y, z = position
-		return (self.lightmap[x][y][z] >> 4) & 0xF
+		return (self.lightmap[(x * CHUNK_LENGTH + z) * CHUNK_HEIGHT + y] >> 4) & 0xF
 
 	def set_sky_light(self, position, value):
 		x, y, z = position
-		self.lightmap[x][y][z] = (self.lightmap[x][y][z] & 0xF) | (value << 4)
+		index = (x * CHUNK_LENGTH + z) * CHUNK_HEIGHT + y
+		self.lightmap[index] = (self.lightmap[index] & 0xF) | (value << 4)
+
+	def fill_sky_light(self, start_y, value):
+		"""Sets the skylight of every block from 'start_y' to the top of the chunk, leaving their block light as is"""
+
+		table = bytes((light & 0xF) | (value << 4) for light in range(256))
+
+		for column in range(0, len(self.lightmap), CHUNK_HEIGHT):
+			start = column + start_y
+			end = column + CHUNK_HEIGHT
+			self.lightmap[start:end] = self.lightmap[start:end].translate(table)
 
 	def get_raw_light(self, position):
 		x, y, z = position
-		return self.lightmap[x][y][z]
+		return self.lightmap[(x * CHUNK_LENGTH + z) * CHUNK_HEIGHT + y]
 
 	def get_block_number(self, position):
-		lx, ly, lz = position
+		x, y, z = position
+		return self.blocks[(x * CHUNK_LENGTH + z) * CHUNK_HEIGHT + y]
+
+	def set_block_number(self, position, number):
+		x, y, z = position
+		index = (x * CHUNK_LENGTH + z) * CHUNK_HEIGHT + y
 
-		block_number = self.blocks[lx][ly][lz]
-		return block_number
+		old_number = self.blocks[index]
+		self.blocks[index] = number
 
-	def get_transparency(self, position):
-		block_type = self.world.block_types[self.get_block_number(position)]
+		section = y // SECTION_HEIGHT
+		self.section_block_counts[section] += bool(number) - bool(old_number)
+
+		# we can't tell cheaply whether a mixed section became uniform again, but it doesn't matter
+		# the uniform sections are only ever used to skip work
+
+		if self.uniform_sections[section] != number:
+			self.uniform_sections[section] = None if self.section_block_counts[section] else 0
+
+		# update the heightmaps, which means looking down the column for the new highest block
+		# if we just removed the previous one
+
+		column = x * CHUNK_LENGTH + z
+		opaque_blocks = self.world.opaque_blocks
+
+		if number and y >= self.heightmap[column]:
+			self.heightmap[column] = y + 1
+
+		elif not number and y + 1 == self.heightmap[column]:
+			self.heightmap[column] = self.find_height(column, y, lambda number: number)
+
+		if opaque_blocks[number] and y >= self.opaque_heightmap[column]:
+			self.opaque_heightmap[column] = y + 1
+
+		elif not opaque_blocks[number] and y + 1 == self.opaque_heightmap[column]:
+			self.opaque_heightmap[column] = self.find_height(column, y, opaque_blocks.__getitem__)
+
+	def find_height(self, column, y, predicate):
+		# height just above the highest block under 'y' in the column for which 'predicate' is true
+
+		start = column * CHUNK_HEIGHT
+
+		while y and not predicate(self.blocks[start + y - 1]):
+			y -= 1
+
+		return y
 
-		if not block_type:
-			return 2
+	def get_blocks(self):
+		return bytes(self.blocks)
 
-		return block_type.transparent
+	def set_blocks(self, blocks):
+		# bulk-replace every block of the chunk, 'blocks' must follow the same stride as 'self.blocks'
+		self.blocks[:] = blocks
+		self.update_sections(blocks)
+		self.update_heightmaps(blocks)
+
+	def update_sections(self, blocks):
+		# recount every section from scratch, one column run at a time
+
+		blocks = bytes(blocks)
+
+		for section in range(SECTION_COUNT):
+			start = section * SECTION_HEIGHT
+			runs = [
+				blocks[column + start : column + start + SECTION_HEIGHT]
+				for column in range(0, len(blocks), CHUNK_HEIGHT)
+			]
+
+			self.section_block_counts[section] = SECTION_HEIGHT * len(runs) - sum(run.count(0) for run in runs)
+
+			run = runs[0]
+			is_uniform = run == run[:1] * SECTION_HEIGHT and len(set(runs)) == 1
+			self.uniform_sections[section] = run[0] if is_uniform else None
+
+	def update_heightmaps(self, blocks):
+		# trailing air at the top of a column is exactly what's above its highest block
+
+		blocks = bytes(blocks)
+		opaque_blocks = self.world.opaque_blocks
+
+		for column in range(CHUNK_WIDTH * CHUNK_LENGTH):
+			run = blocks[column * CHUNK_HEIGHT : (column + 1) * CHUNK_HEIGHT]
+
+			self.heightmap[column] = len(run.rstrip(b"\0"))
+			self.opaque_heightmap[column] = len(run.translate(opaque_blocks).rstrip(b"\0"))
+
+	def get_transparency(self, position):
+		return self.world.block_transparency[self.get_block_number(position)]
 
 	def is_opaque_block(self, position):
-		# get block type and check if it's opaque or not
-		# air counts as a transparent block, so test for that too
+		# air counts as a transparent block in the table, so no need to test for it
+		return self.world.opaque_blocks[self.get_block_number(position)]
+
+	def is_subchunk_empty(self, subchunk):
+		"""Whether we know, from the section it's in alone, that a subchunk has no face to render
+		This is the case for subchunks in an empty section, but also for subchunks buried inside a section
+		full of the same opaque cube (or glass), as all their faces are hidden by their neighbours"""
+
+		lx, ly, lz = subchunk.local_position
+		number = self.uniform_sections[ly // SECTION_HEIGHT]
+
+		if number is None:
+			return False
 
-		block_type = self.world.block_types[self.get_block_number(position)]
+		if not number:
+			return True
 
-		if not block_type:
+		if not self.world.cube_blocks[number] or not (
+			self.world.opaque_blocks[number] or self.world.glass_blocks[number]
+		):
 			return False
 
-		return not block_type.transparent
+		section_ly = ly % SECTION_HEIGHT
+
+		return (
+			0 < lx < CHUNK_WIDTH - SUBCHUNK_WIDTH
+			and 0 < section_ly < SECTION_HEIGHT - SUBCHUNK_HEIGHT
+			and 0 < lz < CHUNK_LENGTH - SUBCHUNK_LENGTH
+		)
+
+	def set_lod(self, lod):
+		self.lod = lod
+		self.update_subchunk_meshes()
 
 	def update_subchunk_meshes(self):
 		self.chunk_update_queue.clear()
@@ -186,69 +469,415 @@ class Chunk:
 			try_update_subchunk_mesh((sx, sy, sz - 1))
 
 	def process_chunk_updates(self):
+		# lower levels of detail can only be meshed by the vectorized mesher
+
+		if self.world.options.VECTORIZED_MESHING or self.lod:
+			self.process_chunk_updates_vectorized()
+			return
+
 		for _ in range(self.world.options.CHUNK_UPDATES):
 			if self.chunk_update_queue:
 				subchunk = self.chunk_update_queue.popleft()
 				subchunk.update_mesh()
+				self.updated_subchunks[subchunk] = None
 				self.world.chunk_update_counter += 1
 				if not self.chunk_update_queue:
 					self.world.chunk_building_queue.append(self)
 					return
 
+	def process_chunk_updates_vectorized(self):
+		# the vectorized mesher has a fixed cost per call, so mesh every pending subchunk at once
+		# if there are mesh workers, this is done in the background, one job per chunk at a time
+
+		if self.mesh_job:
+			if not self.mesh_job.done():
+				return
+
+			self.finish_mesh_job()
+
+		if not self.chunk_update_queue:
+			return
+
+		subchunks = list(self.chunk_update_queue)
+		self.chunk_update_queue.clear()
+
+		snapshot = self.world.get_chunk_snapshot(self.chunk_position)
+		subchunk_positions = [subchunk.subchunk_position for subchunk in subchunks]
+		greedy, smooth = self.world.options.GREEDY_MESHING, self.world.options.SMOOTH_LIGHTING
+
+		if self.world.mesh_workers:
+			self.mesh_job = self.world.mesh_workers.submit(
+				mesh_workers.mesh_subchunks, snapshot, subchunk_positions, greedy, smooth, self.lod
+			)
+			self.mesh_job_subchunks = subchunks
+			return
+
+		meshes = self.world.mesher.mesh_subchunks(snapshot, subchunk_positions, greedy, smooth, self.lod)
+		self.set_subchunk_meshes(subchunks, meshes)
+
+	def finish_mesh_job(self):
+		meshes = self.mesh_job.result()
+
+		# the meshes are stale for subchunks which were queued for update again since the snapshot was taken
+		# (a block or light level affecting them changed), so drop those as they're going to be meshed again anyway
+
+		subchunks = [subchunk for subchunk in self.mesh_job_subchunks if subchunk not in self.chunk_update_queue]
+
+		self.mesh_job = None
+		self.mesh_job_subchunks = []
+
+		self.set_subchunk_meshes(subchunks, meshes)
+
+	def set_subchunk_meshes(self, subchunks, meshes):
+		for subchunk in subchunks:
+			mesh, translucent_mesh, subchunk.face_count = meshes[subchunk.subchunk_position]
+			subchunk.mesh = np.frombuffer(mesh, dtype=np.float32)
+			subchunk.translucent_mesh = np.frombuffer(translucent_mesh, dtype=np.float32)
+			self.updated_subchunks[subchunk] = None
+
+		self.world.chunk_update_counter += len(subchunks)
+		self.world.chunk_building_queue.append(self)
+
 	def update_mesh(self):
-		# combine all the small subchunk meshes into one big chunk mesh
+		if self.world.options.INCREMENTAL_UPLOADS:
+			self.update_subchunk_ranges()
+			return
 
-		for subchunk in self.subchunks.values():
-			self.mesh += subchunk.mesh
-			self.translucent_mesh += subchunk.translucent_mesh
+		self.updated_subchunks.clear()
+
+		# combine all the small subchunk meshes into one big chunk mesh, with the opaque quads of each section together
+
+		subchunks = sorted(self.subchunks.values(), key=get_subchunk_section)
+		self.mesh = concatenate_meshes(subchunk.mesh for subchunk in subchunks)
+		self.translucent_mesh = concatenate_meshes(subchunk.translucent_mesh for subchunk in self.subchunks.values())
 
 		# send the full mesh data to the GPU and free the memory used client-side (we don't need it anymore)
 		# don't forget to save the length of 'self.mesh_indices' before freeing
 
 		self.mesh_quad_count = len(self.mesh) // 28  # 28 = 7 (attributes of a vertex) * 4 (number of vertices per quad)
 		self.translucent_quad_count = len(self.translucent_mesh) // 28
+		self.face_count = sum(subchunk.face_count for subchunk in self.subchunks.values())
+
+		section_quad_counts = [0] * SECTION_COUNT
+
+		for subchunk in subchunks:
+			section_quad_counts[get_subchunk_section(subchunk)] += len(subchunk.mesh) // 28
+
+		self.section_draw_ranges = []
+		first_quad = 0
+
+		for section, quad_count in enumerate(section_quad_counts):
+			if quad_count:
+				self.section_draw_ranges.append((section, quad_count * 6, first_quad * 4))
+
+			first_quad += quad_count
 
 		self.send_mesh_data_to_gpu()
+		self.update_translucent_quads()
+		self.update_visible_draw_ranges()
+
+		self.mesh = np.empty(0, dtype=np.float32)
+		self.translucent_mesh = np.empty(0, dtype=np.float32)
+
+	def update_subchunk_ranges(self):
+		# only upload the meshes of the subchunks which changed, each to a range of its own
+
+		for subchunk in self.updated_subchunks:
+			if subchunk in self.subchunk_ranges:
+				offset, quad_count, translucent_quad_count = self.subchunk_ranges.pop(subchunk)
+				self.allocator.free(offset, quad_count + translucent_quad_count)
+
+			quad_count = len(subchunk.mesh) // 28
+			translucent_quad_count = len(subchunk.translucent_mesh) // 28
+
+			if not quad_count + translucent_quad_count:
+				continue
+
+			offset = self.allocator.allocate(quad_count + translucent_quad_count)
+
+			if offset is None:  # no room left, so pack every range together again, growing the VBO if needed
+				self.compact_subchunk_ranges()
+				break
+
+			gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+			size = self.upload_vertex_data(
+				offset * 4 * self.get_vertex_bytes(), concatenate_meshes((subchunk.mesh, subchunk.translucent_mesh))
+			)
+
+			self.world.uploaded_bytes += size
+			self.subchunk_ranges[subchunk] = (offset, quad_count, translucent_quad_count)
 
-		self.mesh = []
-		self.translucent_mesh = []
+		else:
+			if self.allocator.get_fragmentation() > COMPACTION_THRESHOLD:
+				self.compact_subchunk_ranges()
+
+		self.updated_subchunks.clear()
+
+		self.mesh_quad_count = sum(quad_count for _, quad_count, _ in self.subchunk_ranges.values())
+		self.translucent_quad_count = sum(count for _, _, count in self.subchunk_ranges.values())
+		self.face_count = sum(subchunk.face_count for subchunk in self.subchunks.values())
+
+		self.update_draw_ranges()
+		self.update_translucent_quads()
+
+	def compact_subchunk_ranges(self):
+		# upload the meshes of all subchunks back to back, all at once
+
+		self.subchunk_ranges.clear()
+		meshes = []
+		offset = 0
+
+		for subchunk in self.subchunks.values():
+			quad_count = len(subchunk.mesh) // 28
+			translucent_quad_count = len(subchunk.translucent_mesh) // 28
+
+			if not quad_count + translucent_quad_count:
+				continue
+
+			self.subchunk_ranges[subchunk] = (offset, quad_count, translucent_quad_count)
+			meshes += (subchunk.mesh, subchunk.translucent_mesh)
+			offset += quad_count + translucent_quad_count
+
+		if not offset:
+			self.release_vbo()
+			self.allocator.reset(0)
+			return
+
+		# keep the VBO as it is unless the meshes don't fit anymore, or only fill a small part of it
+
+		quad_bytes = 4 * self.get_vertex_bytes()
+		self.resize_vbo(offset * quad_bytes)
+
+		self.allocator.reset(self.vbo_size // quad_bytes)
+		self.allocator.allocate(offset)
+
+		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+		gl.glBufferData(gl.GL_ARRAY_BUFFER, self.vbo_size, None, gl.GL_DYNAMIC_DRAW)  # Orphaning
+		size = self.upload_vertex_data(0, concatenate_meshes(meshes))
+
+		self.world.uploaded_bytes += size
+
+	def update_draw_ranges(self):
+		# arguments of the multi-draw calls covering the opaque and translucent parts of each subchunk range
+
+		# go through the subchunks in order, so that translucent faces are always drawn in the same order
+
+		subchunks = [subchunk for subchunk in self.subchunks.values() if subchunk in self.subchunk_ranges]
+		ranges = [self.subchunk_ranges[subchunk] for subchunk in subchunks]
+
+		opaque_ranges = [(quad_count * 6, offset * 4) for offset, quad_count, _ in ranges if quad_count]
+		translucent_ranges = [
+			(translucent_quad_count * 6, (offset + quad_count) * 4)
+			for offset, quad_count, translucent_quad_count in ranges
+			if translucent_quad_count
+		]
+
+		self.index_type = self.world.index_buffer.get_index_type(
+			max((index_count // 6 for index_count, _ in opaque_ranges + translucent_ranges), default=0)
+		)
+
+		self.draw_ranges = self.get_multi_draw_arguments(opaque_ranges)
+		self.translucent_draw_ranges = self.get_multi_draw_arguments(translucent_ranges)
+
+		self.section_draw_ranges = [
+			(get_subchunk_section(subchunk), quad_count * 6, offset * 4)
+			for subchunk, (offset, quad_count, _) in zip(subchunks, ranges)
+			if quad_count
+		]
+
+		self.update_visible_draw_ranges()
+
+		if not self.world.options.INDIRECT_RENDERING:
+			return
+
+		first_index = index_buffer.get_first_index(self.index_type)
+
+		self.draw_commands = [
+			value
+			for index_count, base_vertex in opaque_ranges + translucent_ranges
+			for value in (index_count, 1, first_index, base_vertex, 0)
+		]
+
+		gl.glBindBuffer(gl.GL_DRAW_INDIRECT_BUFFER, self.indirect_command_buffer)
+		gl.glBufferData(
+			gl.GL_DRAW_INDIRECT_BUFFER,
+			ctypes.sizeof(gl.GLuint * len(self.draw_commands)),
+			(gl.GLuint * len(self.draw_commands))(*self.draw_commands),
+			gl.GL_DYNAMIC_DRAW,
+		)
+
+	def get_multi_draw_arguments(self, draw_ranges):
+		# index counts, index offsets (all the same, as all quads share the same index pattern), and base vertices
+
+		draw_count = len(draw_ranges)
+
+		return (
+			(gl.GLsizei * draw_count)(*(index_count for index_count, _ in draw_ranges)),
+			(ctypes.c_void_p * draw_count)(*[index_buffer.get_index_offset(self.index_type)] * draw_count),
+			draw_count,
+			(gl.GLint * draw_count)(*(base_vertex for _, base_vertex in draw_ranges)),
+		)
+
+	def set_visible_sections(self, visible_sections):
+		if visible_sections != self.visible_sections:
+			self.visible_sections = visible_sections
+			self.update_visible_draw_ranges()
+
+	def update_visible_draw_ranges(self):
+		if self.visible_sections == ALL_SECTIONS:
+			self.visible_draw_ranges = None
+			self.visible_draw_arguments = None
+			return
+
+		self.visible_draw_ranges = [
+			(index_count, base_vertex)
+			for section, index_count, base_vertex in self.section_draw_ranges
+			if self.visible_sections >> section & 1
+		]
+
+		# without incremental uploads, sections follow each other in the VBO, so consecutive ones are drawn at once
+		# (with them, subchunk ranges may be larger together than what the chunk's index type covers)
+
+		if not self.world.options.INCREMENTAL_UPLOADS:
+			self.visible_draw_ranges = merge_draw_ranges(self.visible_draw_ranges)
+
+		if not self.world.world_buffer:
+			self.visible_draw_arguments = self.get_multi_draw_arguments(self.visible_draw_ranges)
+
+	def draw_visible_sections(self, mode):
+		counts, indices, draw_count, base_vertices = self.visible_draw_arguments
+		gl.glMultiDrawElementsBaseVertex(mode, counts, self.index_type, indices, draw_count, base_vertices)
+
+	def draw_elements(self, mode):
+		if self.visible_draw_arguments is not None:
+			self.draw_visible_sections(mode)
+			return
+
+		if self.draw_ranges is None:
+			gl.glDrawElements(
+				mode, self.mesh_quad_count * 6, self.index_type, index_buffer.get_index_offset(self.index_type)
+			)
+			return
+
+		counts, indices, draw_count, base_vertices = self.draw_ranges
+		gl.glMultiDrawElementsBaseVertex(mode, counts, self.index_type, indices, draw_count, base_vertices)
+
+	def draw_elements_indirect(self, mode):
+		# the command buffer only has commands for whole chunks (or subchunks), so partly visible chunks aren't drawn
+		# from it
+
+		if self.visible_draw_arguments is not None:
+			self.draw_visible_sections(mode)
+			return
+
+		if self.draw_ranges is None:
+			gl.glDrawElementsIndirect(mode, self.index_type, None)
+			return
+
+		gl.glMultiDrawElementsIndirect(mode, self.index_type, None, self.draw_ranges[2], 0)
+
+	def update_translucent_quads(self):
+		# find where each translucent quad ended up in the VBO and where its centre is, so that they can be sorted
+
+		if not self.world.options.FANCY_TRANSLUCENCY:
+			return
+
+		translucent_meshes = []
+		first_quads = []
+		translucent_offset = self.mesh_quad_count  # without incremental uploads, they all come after the opaque quads
+
+		for subchunk in self.subchunks.values():
+			translucent_quad_count = len(subchunk.translucent_mesh) // 28
+
+			if not translucent_quad_count:
+				continue
+
+			if self.world.options.INCREMENTAL_UPLOADS:
+				offset, quad_count, _ = self.subchunk_ranges[subchunk]
+				first_quad = offset + quad_count
+			else:
+				first_quad = translucent_offset
+				translucent_offset += translucent_quad_count
+
+			translucent_meshes.append(subchunk.translucent_mesh)
+			first_quads += range(first_quad, first_quad + translucent_quad_count)
+
+		vertices = concatenate_meshes(translucent_meshes).reshape(-1, 4, vertex_format.FLOAT_VERTEX_SIZE)
+
+		self.translucent_centroids = vertices[:, :, 0:3].mean(axis=1, dtype=np.float64) + self.position
+		self.translucent_first_vertices = np.array(first_quads, dtype=np.uint32) * 4
+		self.translucent_sort_block = None
+
+	def sort_translucent_quads(self, camera_position):
+		"""Sort the translucent quads back to front as seen from 'camera_position', unless they already were from
+		within the same block (and the chunk wasn't remeshed since)"""
+
+		camera_block = tuple(round(i) for i in camera_position)
+
+		if camera_block == self.translucent_sort_block or not self.translucent_quad_count:
+			return
+
+		self.translucent_sort_block = camera_block
+
+		distances = np.square(self.translucent_centroids - tuple(camera_position)).sum(axis=1)
+		order = np.argsort(-distances, kind="stable")
+		indices = (self.translucent_first_vertices[order, np.newaxis] + QUAD_INDICES).ravel()
+
+		if self.world.world_buffer:
+			self.world.world_buffer.translucent_indices.upload(self.translucent_index_offset, indices)
+			self.world.uploaded_bytes += indices.nbytes
+			return
+
+		# the IBO is only bound as such in the translucent VAO, so upload the indices through another target
+
+		gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, self.translucent_ibo)
+		gl.glBufferData(gl.GL_COPY_WRITE_BUFFER, indices.nbytes, indices.ctypes.data, gl.GL_DYNAMIC_DRAW)
+
+		self.world.uploaded_bytes += indices.nbytes
+
+	def get_vertex_bytes(self):
+		return vertex_format.get_vertex_bytes(self.world.options)
 
 	def send_mesh_data_to_gpu(self):  # pass mesh data to gpu
-		if not self.mesh_quad_count:
+		if self.world.world_buffer:
+			self.send_mesh_data_to_world_buffer()
 			return
 
-		gl.glBindVertexArray(self.vao)
+		if not self.mesh_quad_count + self.translucent_quad_count:
+			self.release_vbo()
+			return
+
+		self.resize_vbo((self.mesh_quad_count + self.translucent_quad_count) * 4 * self.get_vertex_bytes())
 
 		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
 		gl.glBufferData(
 			gl.GL_ARRAY_BUFFER,  # Orphaning
-			ctypes.sizeof(gl.GLfloat * CHUNK_WIDTH * CHUNK_HEIGHT * CHUNK_LENGTH * 7),
+			self.vbo_size,
 			None,
 			gl.GL_DYNAMIC_DRAW,
 		)
-		gl.glBufferSubData(
-			gl.GL_ARRAY_BUFFER, 0, ctypes.sizeof(gl.GLfloat * len(self.mesh)), (gl.GLfloat * len(self.mesh))(*self.mesh)
-		)
-		gl.glBufferSubData(
-			gl.GL_ARRAY_BUFFER,
-			ctypes.sizeof(gl.GLfloat * len(self.mesh)),
-			ctypes.sizeof(gl.GLfloat * len(self.translucent_mesh)),
-			(gl.GLfloat * len(self.translucent_mesh))(*self.translucent_mesh),
-		)
+
+		mesh_data_size = self.upload_vertex_data(0, self.mesh)
+		translucent_mesh_data_size = self.upload_vertex_data(mesh_data_size, self.translucent_mesh)
+
+		self.world.uploaded_bytes += mesh_data_size + translucent_mesh_data_size
+		self.index_type = self.world.index_buffer.get_index_type(max(self.mesh_quad_count, self.translucent_quad_count))
 
 		if not self.world.options.INDIRECT_RENDERING:
 			return
 
+		first_index = index_buffer.get_first_index(self.index_type)
+
 		self.draw_commands = [
 			# Index Count                    Instance Count  Base Index     Base Vertex               Base Instance
 			self.mesh_quad_count * 6,
 			1,
-			0,
+			first_index,
 			0,
 			0,  # Opaque mesh commands
 			self.translucent_quad_count * 6,
 			1,
-			0,
+			first_index,
 			self.mesh_quad_count * 4,
 			0,  # Translucent mesh commands
 		]
@@ -261,17 +890,48 @@ class Chunk:
 			(gl.GLuint * len(self.draw_commands))(*self.draw_commands),
 		)
 
+	def send_mesh_data_to_world_buffer(self):
+		# replace the chunk's ranges of the world buffer with new ones, the size of its new meshes
+
+		self.free_world_buffer_ranges()
+		world_buffer = self.world.world_buffer
+		quad_count = self.mesh_quad_count + self.translucent_quad_count
+
+		if not quad_count:
+			return
+
+		self.world_buffer_offset = world_buffer.vertices.allocate(quad_count)
+		self.world_buffer_quad_count = quad_count
+		self.index_type = self.world.index_buffer.get_index_type(max(self.mesh_quad_count, self.translucent_quad_count))
+
+		if self.world.options.FANCY_TRANSLUCENCY and self.translucent_quad_count:
+			self.translucent_index_offset = world_buffer.translucent_indices.allocate(self.translucent_quad_count)
+			self.translucent_index_quad_count = self.translucent_quad_count
+
+		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+
+		self.world.uploaded_bytes += self.upload_vertex_data(
+			self.world_buffer_offset * 4 * self.get_vertex_bytes(),
+			concatenate_meshes((self.mesh, self.translucent_mesh)),
+		)
+
+	def free_world_buffer_ranges(self):
+		world_buffer = self.world.world_buffer
+
+		if self.world_buffer_offset is not None:
+			world_buffer.vertices.free(self.world_buffer_offset, self.world_buffer_quad_count)
+			self.world_buffer_offset = None
+
+		if self.translucent_index_offset is not None:
+			world_buffer.translucent_indices.free(self.translucent_index_offset, self.translucent_index_quad_count)
+			self.translucent_index_offset = None
+
 	def draw_direct(self, mode):
 		if not self.mesh_quad_count:
 			return
 		gl.glBindVertexArray(self.vao)
 		gl.glUniform2i(self.shader_chunk_offset_location, self.chunk_position[0], self.chunk_position[2])
-		gl.glDrawElements(
-			mode,
-			self.mesh_quad_count * 6,
-			gl.GL_UNSIGNED_INT,
-			None,
-		)
+		self.draw_elements(mode)
 
 	def draw_indirect(self, mode):
 		if not self.mesh_quad_count:
@@ -281,11 +941,7 @@ class Chunk:
 		gl.glBindBuffer(gl.GL_DRAW_INDIRECT_BUFFER, self.indirect_command_buffer)
 		gl.glUniform2i(self.shader_chunk_offset_location, self.chunk_position[0], self.chunk_position[2])
 
-		gl.glDrawElementsIndirect(
-			mode,
-			gl.GL_UNSIGNED_INT,
-			None,
-		)
+		self.draw_elements_indirect(mode)
 
 	def draw_direct_advanced(self, mode):
 		if not self.mesh_quad_count:
@@ -295,21 +951,11 @@ class Chunk:
 		gl.glUniform2i(self.shader_chunk_offset_location, self.chunk_position[0], self.chunk_position[2])
 
 		gl.glBeginQuery(gl.GL_ANY_SAMPLES_PASSED, self.occlusion_query)
-		gl.glDrawElements(
-			mode,
-			self.mesh_quad_count * 6,
-			gl.GL_UNSIGNED_INT,
-			None,
-		)
+		self.draw_elements(mode)
 		gl.glEndQuery(gl.GL_ANY_SAMPLES_PASSED)
 
 		gl.glBeginConditionalRender(self.occlusion_query, gl.GL_QUERY_BY_REGION_WAIT)
-		gl.glDrawElements(
-			mode,
-			self.mesh_quad_count * 6,
-			gl.GL_UNSIGNED_INT,
-			None,
-		)
+		self.draw_elements(mode)
 		gl.glEndConditionalRender()
 
 	def draw_indirect_advanced(self, mode):
@@ -321,19 +967,11 @@ class Chunk:
 		gl.glUniform2i(self.shader_chunk_offset_location, self.chunk_position[0], self.chunk_position[2])
 
 		gl.glBeginQuery(gl.GL_ANY_SAMPLES_PASSED, self.occlusion_query)
-		gl.glDrawElementsIndirect(
-			mode,
-			gl.GL_UNSIGNED_INT,
-			None,
-		)
+		self.draw_elements_indirect(mode)
 		gl.glEndQuery(gl.GL_ANY_SAMPLES_PASSED)
 
 		gl.glBeginConditionalRender(self.occlusion_query, gl.GL_QUERY_BY_REGION_WAIT)
-		gl.glDrawElementsIndirect(
-			mode,
-			gl.GL_UNSIGNED_INT,
-			None,
-		)
+		self.draw_elements_indirect(mode)
 		gl.glEndConditionalRender()
 
 	draw_normal = draw_indirect if options.INDIRECT_RENDERING else draw_direct
@@ -347,8 +985,17 @@ class Chunk:
 		gl.glBindVertexArray(self.vao)
 		gl.glUniform2i(self.shader_chunk_offset_location, self.chunk_position[0], self.chunk_position[2])
 
+		if self.translucent_draw_ranges is not None:
+			counts, indices, draw_count, base_vertices = self.translucent_draw_ranges
+			gl.glMultiDrawElementsBaseVertex(mode, counts, self.index_type, indices, draw_count, base_vertices)
+			return
+
 		gl.glDrawElementsBaseVertex(
-			mode, self.translucent_quad_count * 6, gl.GL_UNSIGNED_INT, None, self.mesh_quad_count * 4
+			mode,
+			self.translucent_quad_count * 6,
+			self.index_type,
+			index_buffer.get_index_offset(self.index_type),
+			self.mesh_quad_count * 4,
 		)
 
 	def draw_translucent_indirect(self, mode):
@@ -361,13 +1008,32 @@ class Chunk:
 
 		gl.glMemoryBarrier(gl.GL_COMMAND_BARRIER_BIT)
 
+		if self.translucent_draw_ranges is not None:
+			gl.glMultiDrawElementsIndirect(
+				mode,
+				self.index_type,
+				self.draw_ranges[2] * 5 * ctypes.sizeof(gl.GLuint),  # translucent commands come after the opaque ones
+				self.translucent_draw_ranges[2],
+				0,
+			)
+			return
+
 		gl.glDrawElementsIndirect(
 			mode,
-			gl.GL_UNSIGNED_INT,
+			self.index_type,
 			5
 			* ctypes.sizeof(
 				gl.GLuint
 			),  # offset pointer to the indirect command buffer pointing to the translucent mesh commands
 		)
 
-	draw_translucent = draw_translucent_indirect if options.INDIRECT_RENDERING else draw_translucent_direct
+	def draw_translucent_sorted(self, mode):
+		if not self.mesh_quad_count or not self.translucent_quad_count:
+			return
+
+		gl.glBindVertexArray(self.translucent_vao)
+		gl.glUniform2i(self.shader_chunk_offset_location, self.chunk_position[0], self.chunk_position[2])
+		gl.glDrawElements(mode, self.translucent_quad_count * 6, gl.GL_UNSIGNED_INT, None)
+
+	draw_translucent_unsorted = draw_translucent_indirect if options.INDIRECT_RENDERING else draw_translucent_direct
+	draw_translucent = draw_translucent_sorted if options.FANCY_TRANSLUCENCY else draw_translucent_unsorted
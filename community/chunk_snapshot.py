@@ -0,0 +1,112 @@
+import functools
+
+import numpy as np
+
+from chunk import CHUNK_WIDTH, CHUNK_HEIGHT, CHUNK_LENGTH
+
+# Self-contained copy of a chunk's blocks and light levels, along with a one block border taken from its neighbours
+# Anything working on a whole chunk at once (meshers, lighting, worker processes, ...) can read these arrays
+# without going back through the world's chunk lookups, and without caring about chunk boundaries
+
+PADDED_WIDTH = CHUNK_WIDTH + 2
+PADDED_HEIGHT = CHUNK_HEIGHT + 2
+PADDED_LENGTH = CHUNK_LENGTH + 2
+
+# what's assumed outside of loaded chunks, which is the same as what the world's getters return
+
+BORDER_BLOCK = 0
+BORDER_RAW_LIGHT = 15 << 4  # no block light, full skylight
+
+
+def get_chunk_array(data):
+	# view of a chunk's blocks or lightmap as an (x, z, y) array, without copying when possible
+
+	if not isinstance(data, (bytes, bytearray)):
+		data = bytes(data)
+
+	return np.frombuffer(data, dtype=np.uint8).reshape(CHUNK_WIDTH, CHUNK_LENGTH, CHUNK_HEIGHT)
+
+
+def get_border_slices(offset, size):
+	# slices into the padded array and into the neighbouring chunk at 'offset' (-1, 0 or 1) along one axis
+
+	if offset < 0:
+		return slice(0, 1), slice(size - 1, size)
+
+	if offset > 0:
+		return slice(size + 1, size + 2), slice(0, 1)
+
+	return slice(1, size + 1), slice(0, size)
+
+
+def get_cells(array, scale):
+	"""Split a padded (x, z, y) array into cubic cells of 'scale' blocks along each axis, its border being stretched
+	out into a border of whole cells; returns a (x, z, y, block) array of the cells, with their blocks going from
+	their top layer down"""
+
+	for axis, size in enumerate(array.shape):
+		repeats = np.ones(size, dtype=np.int64)
+		repeats[[0, -1]] = scale
+		array = np.repeat(array, repeats, axis=axis)
+
+	width, length, height = (size // scale for size in array.shape)
+
+	cells = array.reshape(width, scale, length, scale, height, scale).transpose(0, 2, 4, 5, 1, 3)[:, :, :, ::-1]
+	return cells.reshape(width, length, height, scale**3)
+
+
+class Chunk_snapshot:
+	"""Padded block numbers, block light and skylight of a chunk, as contiguous 'numpy.uint8' arrays
+	The arrays are indexed [x + 1, z + 1, y + 1] in local coordinates, like the chunk's own arrays, so that
+	the border blocks lie at -1 and at the chunk size along each axis
+	Downsampled snapshots (with a 'scale' above 1) hold cells of 'scale' blocks along each axis instead of blocks"""
+
+	def __init__(self, chunk_position, scale=1):
+		self.chunk_position = chunk_position
+		self.scale = scale
+
+		shape = (CHUNK_WIDTH // scale + 2, CHUNK_LENGTH // scale + 2, CHUNK_HEIGHT // scale + 2)
+
+		self.blocks = np.full(shape, BORDER_BLOCK, dtype=np.uint8)
+		self.raw_light = np.full(shape, BORDER_RAW_LIGHT, dtype=np.uint8)
+
+	def copy_chunk(self, chunk, offset):
+		"""Copy over the part of 'chunk' overlapping the snapshot, 'offset' being its chunk position relative
+		to the snapshot's chunk"""
+
+		dx, dy, dz = offset
+
+		x_slice, source_x_slice = get_border_slices(dx, CHUNK_WIDTH)
+		y_slice, source_y_slice = get_border_slices(dy, CHUNK_HEIGHT)
+		z_slice, source_z_slice = get_border_slices(dz, CHUNK_LENGTH)
+
+		source = (source_x_slice, source_z_slice, source_y_slice)
+
+		self.blocks[x_slice, z_slice, y_slice] = get_chunk_array(chunk.blocks)[source]
+		self.raw_light[x_slice, z_slice, y_slice] = get_chunk_array(chunk.lightmap)[source]
+
+	def downsample(self, scale, solid_blocks):
+		"""Snapshot of the chunk at a lower resolution, each cell of 'scale' blocks along each axis being turned into
+		the topmost of its blocks in 'solid_blocks' (a boolean table indexed by block number) if they make up at least
+		half of it, and into air otherwise; cells are lit with the highest light levels found in them"""
+
+		snapshot = Chunk_snapshot(self.chunk_position, self.scale * scale)
+
+		cells = get_cells(self.blocks, scale)
+		is_solid = solid_blocks[cells]
+
+		top_blocks = np.take_along_axis(cells, is_solid.argmax(axis=3)[..., np.newaxis], axis=3)[..., 0]
+		snapshot.blocks[:] = np.where(is_solid.sum(axis=3) * 2 >= scale**3, top_blocks, BORDER_BLOCK)
+
+		light_cells = get_cells(self.raw_light, scale)
+		snapshot.raw_light[:] = (light_cells & 0xF).max(axis=3) | (light_cells >> 4).max(axis=3) << 4
+
+		return snapshot
+
+	@functools.cached_property
+	def light(self):
+		return self.raw_light & 0xF
+
+	@functools.cached_property
+	def skylight(self):
+		return self.raw_light >> 4
@@ -93,14 +93,12 @@ class Controller:
 			x = random.randint(min_x, max_x)
 			z = random.randint(min_z, max_z)
 
-			# find height at which to teleport to, by finding the first non-air block from the top of the world
+			# find height at which to teleport to, which is just above the highest block of the column
 
-			for y in range(chunk.CHUNK_HEIGHT - 1, -1, -1):
-				if not self.game.world.get_block_number((x, y, z)):
-					continue
+			y = self.game.world.get_highest_block(x, z)
 
+			if y >= 0:
 				self.game.player.teleport((x, y + 1, z))
-				break
 		elif mode == self.MiscMode.TOGGLE_F3:
 			self.game.show_f3 = not self.game.show_f3
 		elif mode == self.MiscMode.TOGGLE_AO:
@@ -0,0 +1,111 @@
+import numpy as np
+
+from chunk import CHUNK_WIDTH, CHUNK_HEIGHT, CHUNK_LENGTH, SECTION_HEIGHT, SECTION_COUNT
+
+# Frustum culling of all chunks at once, rather than of one chunk at a time through 'glm'
+# The bounding boxes of all chunks are kept in an array, and tested against the 6 frustum planes in a single pass: a box
+# is outside of a plane if its corner furthest along the plane's normal (its p-vertex) is, which is the same as all 8
+# of its corners being outside, and it's culled if it's outside of any of them
+# The sections of the visible chunks are then tested the same way, so that the ones entirely above or below the view
+# (which is most of them when underground or high up) aren't drawn either
+# Neither the chunks within render distance (nor their order) nor the visible ones are recomputed every frame: the
+# former only change when the camera changes chunk or chunks are added, and the latter when the frustum moves too
+
+CHUNK_EXTENTS = np.array((CHUNK_WIDTH, CHUNK_HEIGHT, CHUNK_LENGTH), dtype=np.float64)
+SECTION_EXTENTS = np.array((CHUNK_WIDTH, SECTION_HEIGHT, CHUNK_LENGTH), dtype=np.float64)
+
+SECTION_OFFSETS = np.array([(0, section * SECTION_HEIGHT, 0) for section in range(SECTION_COUNT)], dtype=np.float64)
+SECTION_BITS = 1 << np.arange(SECTION_COUNT)
+
+# how much any of the frustum planes (normalized, so about radians for their normals and blocks for their distances)
+# has to change since chunks were last culled for them to be culled again
+
+PLANE_THRESHOLD = 1e-3
+
+
+class Chunk_culler:
+	def __init__(self, chunks):
+		self.chunks = chunks  # the world's chunks, which are only ever added to
+
+		self.chunk_list = []  # same chunks, in the order of the arrays
+		self.chunk_positions = np.empty((0, 3), dtype=np.int64)
+		self.box_minimums = np.empty((0, 3), dtype=np.float64)  # bottom corners of the bounding boxes
+
+		# indices of the chunks within render distance, nearest first, and of the camera chunk they were found from
+
+		self.candidates = None
+		self.camera_chunk_position = None
+
+		# chunks found visible, nearest first, and the planes they were found with
+
+		self.visible_chunks = []
+		self.planes = None
+
+	def update(self):
+		if len(self.chunk_list) == len(self.chunks):
+			return
+
+		self.chunk_list = list(self.chunks.values())
+		self.chunk_positions = np.array([tuple(chunk.chunk_position) for chunk in self.chunk_list], dtype=np.int64)
+		self.chunk_positions = self.chunk_positions.reshape(-1, 3)
+
+		# chunks span the whole height of the world, whatever the y of their position
+
+		self.box_minimums = self.chunk_positions * CHUNK_EXTENTS
+		self.box_minimums[:, 1] = 0
+
+		self.candidates = None
+
+	def update_candidates(self, camera_chunk_position, render_distance):
+		camera_chunk_position = tuple(camera_chunk_position)
+
+		if self.candidates is not None and camera_chunk_position == self.camera_chunk_position:
+			return
+
+		# squared distances order chunks just like distances do, and a stable sort keeps ties in the order chunks were
+		# added in
+
+		distances = self.chunk_positions - np.array(camera_chunk_position, dtype=np.int64)
+		distance_keys = np.einsum("ij,ij->i", distances, distances)
+		order = np.argsort(distance_keys, kind="stable")
+
+		self.candidates = order[distance_keys[order] <= render_distance**2]
+		self.camera_chunk_position = camera_chunk_position
+		self.planes = None
+
+	def cull(self, planes, camera_chunk_position, render_distance):
+		"""Update 'visible_chunks' to the chunks within 'render_distance' chunks of 'camera_chunk_position' which aren't
+		entirely outside of any of 'planes' (normalized, and facing inwards), nearest first
+		Returns whether it was updated at all, as it's only when the planes or the candidates changed enough"""
+
+		self.update()
+		self.update_candidates(camera_chunk_position, render_distance)
+
+		planes = np.array([tuple(plane) for plane in planes], dtype=np.float64)
+
+		if self.planes is not None and np.abs(planes - self.planes).max() <= PLANE_THRESHOLD:
+			return False
+
+		normals = planes[:, :3]
+
+		# distance of each plane to the p-vertex of each box, split into what depends on the box (its bottom corner)
+		# and what doesn't (how far the p-vertex is from the bottom corner, the same for all boxes)
+
+		offsets = planes[:, 3] + np.maximum(normals, 0) @ CHUNK_EXTENTS
+		in_frustum = np.all(self.box_minimums[self.candidates] @ normals.T + offsets >= 0, axis=1)
+
+		visible_indices = self.candidates[in_frustum]
+
+		self.visible_chunks = [self.chunk_list[i] for i in visible_indices]
+		self.planes = planes
+
+		# same for the sections of the visible chunks, giving a bit mask of their visible sections
+
+		section_minimums = self.box_minimums[visible_indices, np.newaxis] + SECTION_OFFSETS
+		section_offsets = planes[:, 3] + np.maximum(normals, 0) @ SECTION_EXTENTS
+		in_frustum = np.all(section_minimums @ normals.T + section_offsets >= 0, axis=2)
+
+		for visible_chunk, visible_sections in zip(self.visible_chunks, (in_frustum @ SECTION_BITS).tolist()):
+			visible_chunk.set_visible_sections(visible_sections)
+
+		return True
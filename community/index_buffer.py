@@ -0,0 +1,63 @@
+import numpy as np
+import pyglet.gl as gl
+
+# Shared IBO for all chunk meshes, whose quads all have their 4 vertices in a row, so the same indices draw any of them
+# It starts with 16-bit indices for as many quads as they can address, which is enough for nearly every draw, and 32-bit
+# indices only follow for draws larger than that, as many as the largest of them needs (in power-of-two steps)
+
+# indices of the two triangles of a quad, relative to its first vertex
+
+QUAD_INDICES = np.array((0, 1, 2, 2, 3, 0), dtype=np.uint32)
+
+SHORT_QUAD_COUNT = (1 << 16) // 4  # most quads 16-bit indices can address
+SHORT_INDICES_SIZE = SHORT_QUAD_COUNT * len(QUAD_INDICES) * 2
+
+
+def get_quad_indices(quad_count, dtype):
+	return (np.arange(quad_count, dtype=dtype)[:, np.newaxis] * 4 + QUAD_INDICES.astype(dtype)).ravel()
+
+
+def get_index_offset(index_type):
+	# in bytes, for 'glDrawElements' and the like
+	return 0 if index_type == gl.GL_UNSIGNED_SHORT else SHORT_INDICES_SIZE
+
+
+def get_first_index(index_type):
+	# in indices, for draw commands
+	return 0 if index_type == gl.GL_UNSIGNED_SHORT else SHORT_INDICES_SIZE // 4
+
+
+class Index_buffer:
+	def __init__(self):
+		self.int_quad_count = 0  # number of quads the 32-bit indices cover
+
+		self.buffer = gl.GLuint(0)
+		gl.glGenBuffers(1, self.buffer)
+		self.update()
+
+	def delete(self):
+		gl.glDeleteBuffers(1, self.buffer)
+
+	def update(self):
+		# regenerate the whole buffer, keeping its name, as it's bound to every chunk VAO
+
+		short_indices = get_quad_indices(SHORT_QUAD_COUNT, np.uint16)
+		int_indices = get_quad_indices(self.int_quad_count, np.uint32)
+		data = np.concatenate((short_indices.view(np.uint8), int_indices.view(np.uint8)))
+
+		# not through GL_ELEMENT_ARRAY_BUFFER, as it would change the IBO of whichever VAO is bound
+
+		gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, self.buffer)
+		gl.glBufferData(gl.GL_COPY_WRITE_BUFFER, data.nbytes, data.ctypes.data, gl.GL_STATIC_DRAW)
+
+	def get_index_type(self, quad_count):
+		# type of the indices to draw up to 'quad_count' quads at once with, generating more of them if need be
+
+		if quad_count <= SHORT_QUAD_COUNT:
+			return gl.GL_UNSIGNED_SHORT
+
+		if quad_count > self.int_quad_count:
+			self.int_quad_count = 1 << (quad_count - 1).bit_length()
+			self.update()
+
+		return gl.GL_UNSIGNED_INT
@@ -1,5 +1,4 @@
 import platform
-import ctypes
 import logging
 import random
 import time
@@ -18,6 +17,8 @@ import player
 import texture_manager
 
 import world
+import mesher
+import vertex_format
 
 import options
 
@@ -33,6 +34,16 @@ class InternalConfig:
 		self.INDIRECT_RENDERING = options.INDIRECT_RENDERING
 		self.ADVANCED_OPENGL = options.ADVANCED_OPENGL
 		self.CHUNK_UPDATES = options.CHUNK_UPDATES
+		self.VECTORIZED_MESHING = options.VECTORIZED_MESHING
+		self.MESH_WORKERS = options.MESH_WORKERS
+		self.GREEDY_MESHING = options.GREEDY_MESHING
+		self.PACKED_VERTICES = options.PACKED_VERTICES
+		self.INCREMENTAL_UPLOADS = options.INCREMENTAL_UPLOADS
+		self.STAGING_BUFFER = options.STAGING_BUFFER
+		self.WORLD_BUFFER = options.WORLD_BUFFER
+		self.LOD_DISTANCES = options.LOD_DISTANCES
+		self.LOD_HYSTERESIS = options.LOD_HYSTERESIS
+		self.PALETTED_STORAGE = options.PALETTED_STORAGE
 		self.VSYNC = options.VSYNC
 		self.MAX_CPU_AHEAD_FRAMES = options.MAX_CPU_AHEAD_FRAMES
 		self.SMOOTH_FPS = options.SMOOTH_FPS
@@ -57,6 +68,14 @@ class Window(pyglet.window.Window):
 			Please disable "INDIRECT_RENDERING" in options.py"""
 			)
 
+		if self.options.WORLD_BUFFER and not gl.gl_info.have_version(4, 3):
+			logging.warning("The world buffer requires OpenGL 4.3+, drawing chunks one by one instead")
+			self.options.WORLD_BUFFER = False
+
+		if self.options.WORLD_BUFFER:
+			self.options.INCREMENTAL_UPLOADS = False
+			self.options.ADVANCED_OPENGL = False
+
 		# F3 Debug Screen
 
 		self.show_f3 = False
@@ -79,10 +98,21 @@ Display: {gl.gl_info.get_renderer()}
 		# create shader
 
 		logging.info("Compiling Shaders")
+		shader_defines = []
+
+		if self.options.PACKED_VERTICES:
+			shader_defines.append("PACKED_VERTICES")
+
+		if self.options.WORLD_BUFFER:
+			shader_defines.append("WORLD_BUFFER")
 		if not self.options.COLORED_LIGHTING:
-			self.shader = shader.Shader("shaders/alpha_lighting/vert.glsl", "shaders/alpha_lighting/frag.glsl")
+			self.shader = shader.Shader(
+				"shaders/alpha_lighting/vert.glsl", "shaders/alpha_lighting/frag.glsl", shader_defines
+			)
 		else:
-			self.shader = shader.Shader("shaders/colored_lighting/vert.glsl", "shaders/colored_lighting/frag.glsl")
+			self.shader = shader.Shader(
+				"shaders/colored_lighting/vert.glsl", "shaders/colored_lighting/frag.glsl", shader_defines
+			)
 		self.shader_sampler_location = self.shader.find_uniform(b"u_TextureArraySampler")
 		self.shader.use()
 
@@ -181,6 +211,15 @@ Display: {gl.gl_info.get_renderer()}
 		visible_chunk_count = len(self.world.visible_chunks)
 		quad_count = sum(chunk.mesh_quad_count for chunk in self.world.chunks.values())
 		visible_quad_count = sum(chunk.mesh_quad_count for chunk in self.world.visible_chunks)
+		visible_section_count = sum(chunk.visible_sections.bit_count() for chunk in self.world.visible_chunks)
+		face_count = sum(chunk.face_count for chunk in self.world.chunks.values())
+		lod_chunk_counts = [0] * (mesher.MAX_LOD + 1)
+		for visible_chunk in self.world.visible_chunks:
+			lod_chunk_counts[visible_chunk.lod] += 1
+		player_chunk = self.world.chunks.get(player_chunk_pos, None)
+		total_quad_count = sum(
+			chunk.mesh_quad_count + chunk.translucent_quad_count for chunk in self.world.chunks.values()
+		)
 		self.f3.text = f"""
 {round(1 / delta_time)} FPS ({self.world.chunk_update_counter} Chunk Updates) {"inf" if not self.options.VSYNC else "vsync"}{"ao" if self.options.SMOOTH_LIGHTING else ""}
 C: {visible_chunk_count} / {chunk_count} pC: {self.world.pending_chunk_update_count} pU: {len(self.world.chunk_building_queue)} aB: {chunk_count}
@@ -193,11 +232,14 @@ Light: {max(self.world.get_light(self.player.rounded_position), self.world.get_s
 
 {self.system_info}
 
-Renderer: {"OpenGL 3.3 VAOs" if not self.options.INDIRECT_RENDERING else "OpenGL 4.0 VAOs Indirect"} {"Conditional" if self.options.ADVANCED_OPENGL else ""}
+Renderer: {"OpenGL 4.3 World Buffer Multi-Draw Indirect" if self.options.WORLD_BUFFER else "OpenGL 3.3 VAOs" if not self.options.INDIRECT_RENDERING else "OpenGL 4.0 VAOs Indirect"} {"Conditional" if self.options.ADVANCED_OPENGL else ""}
 Buffers: {chunk_count}
-Vertex Data: {round(quad_count * 28 * ctypes.sizeof(gl.GLfloat) / 1048576, 3)} MiB ({quad_count} Quads)
+Vertex Data: {round(quad_count * 4 * vertex_format.get_vertex_bytes(self.options) / 1048576, 3)} MiB ({quad_count} Quads{", packed" if self.options.PACKED_VERTICES else ""}) in {round(self.world.get_vertex_buffer_size() / 1048576, 3)} MiB of VRAM
 Visible Quads: {visible_quad_count}
-Buffer Uploading: Direct (glBufferSubData)
+Culling: {round(self.world.culling_time * 1000, 3)} ms ({visible_chunk_count} / {chunk_count} Chunks, {visible_section_count} Sections Visible)
+LOD: {player_chunk.lod if player_chunk else 0} here, {" / ".join(map(str, lod_chunk_counts))} Visible Chunks per Level
+Greedy Meshing: {"ON" if self.options.GREEDY_MESHING else "OFF"} ({face_count} Faces in {total_quad_count} Quads)
+Buffer Uploading: {"Staging (glCopyBufferSubData" if self.world.staging_buffer else "Direct (glBufferSubData"}{", per subchunk" if self.options.INCREMENTAL_UPLOADS else ""}) {round(self.world.uploaded_bytes / 1024, 1)} KiB this tick
 """
 
 	def update(self, delta_time):
@@ -0,0 +1,29 @@
+import concurrent.futures
+
+# Pool of worker processes running the vectorized mesher, so that meshing doesn't hold up the main thread
+# Jobs are made of a chunk snapshot and the subchunks to mesh in it, and nothing but the resulting vertex data
+# comes back, so the main thread is left with only uploading it
+
+mesher = None  # the world's mesher, sent over once when the worker process starts
+
+
+def init_worker(world_mesher):
+	global mesher
+	mesher = world_mesher
+
+
+def create_pool(world):
+	return concurrent.futures.ProcessPoolExecutor(
+		world.options.MESH_WORKERS, initializer=init_worker, initargs=(world.mesher,)
+	)
+
+
+def mesh_subchunks(snapshot, subchunk_positions, greedy, smooth, lod):
+	# same as 'Mesher.mesh_subchunks', with the meshes as raw bytes, which are much cheaper to send back
+
+	return {
+		subchunk_position: (mesh.tobytes(), translucent_mesh.tobytes(), face_count)
+		for subchunk_position, (mesh, translucent_mesh, face_count) in mesher.mesh_subchunks(
+			snapshot, subchunk_positions, greedy, smooth, lod
+		).items()
+	}
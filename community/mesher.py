@@ -0,0 +1,417 @@
+import numpy as np
+
+import models.cube
+from chunk import CHUNK_WIDTH, CHUNK_HEIGHT, CHUNK_LENGTH
+from subchunk import SUBCHUNK_WIDTH, SUBCHUNK_HEIGHT, SUBCHUNK_LENGTH
+
+# Vectorized mesher, building the meshes of many subchunks at once from a chunk snapshot (see 'chunk_snapshot.py')
+# Rather than looking at every block and its neighbours one by one, the visible faces in each direction are found
+# by comparing the snapshot's block array with a shifted view of itself, and the vertices of all of them are then
+# built in bulk from per block type tables
+# The meshes are exactly the ones 'Subchunk.update_mesh' would build, faces included in the same order, and that
+# goes for smooth lighting and ambient occlusion too, which are computed for all faces at once from the snapshot
+# It can also merge faces together greedily, which makes for far fewer faces (and vertices) to draw
+
+# offsets of the neighbour each face of a cube looks at, in the same order as 'util.DIRECTIONS'
+
+FACE_DIRECTIONS = ((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1))
+
+# neighbours of the block in front of each face which smooth lighting and ambient occlusion look at, in the same
+# order as 'Subchunk.get_neighbour_voxels': with 'r' and 'c' the two directions given for a face, they're
+# r + c, r, r - c, c, -c, -r + c, -r, -r - c
+
+
+def get_neighbour_offsets(r, c):
+	r, c = np.array(r), np.array(c)
+	return (r + c, r, r - c, c, -c, -r + c, -r, -r - c)
+
+
+NEIGHBOUR_OFFSETS = np.array(
+	[
+		get_neighbour_offsets((0, 1, 0), (0, 0, 1)),  # EAST: up, south
+		get_neighbour_offsets((0, 1, 0), (0, 0, -1)),  # WEST: up, north
+		get_neighbour_offsets((0, 0, 1), (1, 0, 0)),  # UP: south, east
+		get_neighbour_offsets((0, 0, 1), (-1, 0, 0)),  # DOWN: south, west
+		get_neighbour_offsets((0, 1, 0), (-1, 0, 0)),  # SOUTH: up, west
+		get_neighbour_offsets((0, 1, 0), (1, 0, 0)),  # NORTH: up, east
+	]
+)
+
+# neighbours (indices into the ones above) each corner of a face is smoothed and occluded with: both sides first,
+# then the diagonal one, as in 'Subchunk.get_face_ao' and 'Subchunk.get_smooth_face_light'
+
+CORNER_NEIGHBOURS = np.array(((1, 3, 0), (3, 6, 5), (4, 6, 7), (1, 4, 2)))
+
+# axes along which the faces of each direction are merged by the greedy mesher (the two in the plane of the face)
+
+FACE_AXES = ((2, 1), (2, 1), (0, 2), (0, 2), (0, 1), (0, 1))
+
+# the texture fetcher of a merged face tells the shader to tile its texture along the face, rather than stretch it,
+# by setting a UV mode above the texture index (0 for regular faces, the face index + 1 for merged ones)
+
+UV_MODE_SHIFT = 10
+
+# levels of detail are meshed from cells of 2 ** level blocks along each axis, which mustn't straddle subchunks
+
+MAX_LOD = 2
+
+MAX_FACES = 8  # most faces any model has (crops)
+
+VERTEX_SIZE = 7  # x, y, z, texture fetcher, shading, block light, skylight
+
+SUBCHUNK_COUNTS = (
+	CHUNK_WIDTH // SUBCHUNK_WIDTH,
+	CHUNK_HEIGHT // SUBCHUNK_HEIGHT,
+	CHUNK_LENGTH // SUBCHUNK_LENGTH,
+)
+
+
+class Mesher:
+	"""Block type data of a world, laid out as numpy tables indexed by block number
+	It doesn't hold on to the world itself, so it can be sent over to other processes"""
+
+	def __init__(self, world):
+		self.cube_blocks = np.frombuffer(world.cube_blocks, dtype=np.uint8).astype(bool)
+		self.translucent_blocks = np.frombuffer(world.translucent_blocks, dtype=np.uint8).astype(bool)
+		self.light_source_blocks = np.frombuffer(world.light_source_blocks, dtype=np.uint8).astype(bool)
+		self.opaque_blocks = np.frombuffer(world.opaque_blocks, dtype=np.uint8).astype(np.int64)
+		self.face_visibility = np.frombuffer(world.face_visibility, dtype=np.uint8).astype(bool).reshape(256, 256)
+
+		self.face_counts = np.zeros(256, dtype=np.int64)
+		self.vertex_positions = np.zeros((256, MAX_FACES, 4, 3))
+		self.tex_indices = np.zeros((256, MAX_FACES), dtype=np.int64)
+		self.shading_values = np.zeros((256, MAX_FACES, 4))
+
+		for number, _block_type in enumerate(world.block_types):
+			if not _block_type:
+				continue
+
+			face_count = len(_block_type.vertex_positions)
+
+			self.face_counts[number] = face_count
+			self.vertex_positions[number, :face_count] = np.reshape(_block_type.vertex_positions, (face_count, 4, 3))
+			self.tex_indices[number, :face_count] = _block_type.tex_indices
+			self.shading_values[number, :face_count] = _block_type.shading_values
+
+		# faces which the greedy mesher may merge together: full cube faces with the same shading on every corner
+		# they're given material numbers, and faces may only be merged with faces of the same material
+
+		self.face_materials = np.full((256, MAX_FACES), -1, dtype=np.int64)
+
+		cube_vertex_positions = np.reshape(models.cube.vertex_positions, (len(FACE_DIRECTIONS), 4, 3))
+		materials = {}
+
+		for number in np.nonzero(self.cube_blocks)[0]:
+			for face in range(len(FACE_DIRECTIONS)):
+				shading = self.shading_values[number, face]
+
+				is_full_face = (self.vertex_positions[number, face] == cube_vertex_positions[face]).all()
+
+				if not is_full_face or (shading != shading[0]).any():
+					continue
+
+				material = (self.tex_indices[number, face], shading[0], self.translucent_blocks[number])
+				self.face_materials[number, face] = materials.setdefault(material, len(materials))
+
+	def find_faces(self, snapshot, start, end):
+		"""Every face to render between the local positions 'start' (included) and 'end' (excluded)
+		Returns the local positions of the blocks they belong to, their block numbers, their face indices,
+		and the raw light levels they're lit with"""
+
+		x0, y0, z0 = start
+		x1, y1, z1 = end
+
+		blocks = snapshot.blocks
+		raw_light = snapshot.raw_light
+
+		region = blocks[x0 + 1 : x1 + 1, z0 + 1 : z1 + 1, y0 + 1 : y1 + 1]
+		is_cube = self.cube_blocks[region]
+
+		positions = []
+		numbers = []
+		faces = []
+		lights = []
+
+		# cube faces are culled against their neighbours, and lit with the light of the block in front of them
+
+		for face, (dx, dy, dz) in enumerate(FACE_DIRECTIONS):
+			neighbours = blocks[x0 + 1 + dx : x1 + 1 + dx, z0 + 1 + dz : z1 + 1 + dz, y0 + 1 + dy : y1 + 1 + dy]
+			xs, zs, ys = np.nonzero(is_cube & self.face_visibility[region, neighbours])
+
+			positions.append(np.stack((xs + x0, ys + y0, zs + z0), axis=1))
+			numbers.append(region[xs, zs, ys])
+			faces.append(np.full(len(xs), face))
+			lights.append(raw_light[xs + x0 + 1 + dx, zs + z0 + 1 + dz, ys + y0 + 1 + dy])
+
+		# every face of other models is rendered, lit with the light of the block itself
+
+		xs, zs, ys = np.nonzero((region != 0) & ~is_cube)
+		block_numbers = region[xs, zs, ys]
+		face_counts = self.face_counts[block_numbers]
+		face_starts = np.cumsum(face_counts) - face_counts
+
+		positions.append(np.repeat(np.stack((xs + x0, ys + y0, zs + z0), axis=1), face_counts, axis=0))
+		numbers.append(np.repeat(block_numbers, face_counts))
+		faces.append(np.arange(face_counts.sum()) - np.repeat(face_starts, face_counts))
+		lights.append(np.repeat(raw_light[xs + x0 + 1, zs + z0 + 1, ys + y0 + 1], face_counts))
+
+		return np.concatenate(positions), np.concatenate(numbers), np.concatenate(faces), np.concatenate(lights)
+
+	def light_faces(self, snapshot, positions, numbers, faces, lights, smooth):
+		"""Shading, block light and skylight of every corner of the faces, shaped (face, corner, 3)
+		With 'smooth', cube faces are given ambient occlusion and smooth lighting, following the same rules as
+		'subchunk.ao' and 'subchunk.smooth'"""
+
+		corners = np.empty((len(faces), 4, 3))
+		corners[:, :, 0] = self.shading_values[numbers, faces]
+		corners[:, :, 1] = (lights & 0xF)[:, np.newaxis]
+		corners[:, :, 2] = (lights >> 4)[:, np.newaxis]
+
+		if not smooth:
+			return corners
+
+		# light sources are lit evenly with their own light levels, rather than with those in front of their faces
+
+		is_light_source = self.light_source_blocks[numbers]
+		xs, ys, zs = positions[is_light_source].T
+		source_lights = snapshot.raw_light[xs + 1, zs + 1, ys + 1]
+
+		corners[is_light_source, :, 1] = (source_lights & 0xF)[:, np.newaxis]
+		corners[is_light_source, :, 2] = (source_lights >> 4)[:, np.newaxis]
+
+		# every other cube face looks at the 8 neighbours of the block in front of it
+
+		smoothed = np.nonzero(self.cube_blocks[numbers] & ~is_light_source)[0]
+		smoothed_faces = faces[smoothed]
+
+		fronts = positions[smoothed] + np.array(FACE_DIRECTIONS)[smoothed_faces] + 1
+		neighbours = fronts[:, np.newaxis, :] + NEIGHBOUR_OFFSETS[smoothed_faces]
+
+		front_cells = (fronts[:, 0], fronts[:, 2], fronts[:, 1])
+		neighbour_cells = (neighbours[:, :, 0], neighbours[:, :, 2], neighbours[:, :, 1])
+
+		# ambient occlusion, corners being fully occluded if both their sides are
+
+		opacity = self.opaque_blocks[snapshot.blocks[neighbour_cells]][:, CORNER_NEIGHBOURS]
+		sides = opacity[:, :, 0] & opacity[:, :, 1]
+
+		corners[smoothed, :, 0] *= np.where(sides, 0.25, 1 - opacity.sum(axis=2) / 4)
+
+		# smooth lighting, averaging the light in front of the face with that of the neighbours around each corner,
+		# raising the unlit ones to the darkest of the others, so that light doesn't get averaged with darkness
+
+		for attribute, levels in ((1, snapshot.light), (2, snapshot.skylight)):
+			front_levels = levels[front_cells].astype(np.int64)[:, np.newaxis]
+			corner_levels = levels[neighbour_cells].astype(np.int64)[:, CORNER_NEIGHBOURS]
+
+			lowest = np.minimum(front_levels, np.where(corner_levels, corner_levels, 0xFF).min(axis=2))
+			corner_levels = np.maximum(corner_levels, lowest[:, :, np.newaxis])
+
+			corners[smoothed, :, attribute] = (front_levels + corner_levels.sum(axis=2)) / 4
+
+		return corners
+
+	def merge_faces(self, positions, numbers, faces, corners, start, end):
+		"""Greedily merge adjacent faces of the same material, lit the same way, into larger rectangular faces
+		Faces are merged in runs along the first axis of their plane first, and runs of the same length are then
+		stacked along the second axis; merged faces never straddle two subchunks
+		Returns the positions, block numbers, face indices and corner lighting (see 'light_faces') of the resulting
+		faces, along with the extents (in blocks, minus one) of each of them along every axis"""
+
+		subchunk_size = np.array((SUBCHUNK_WIDTH, SUBCHUNK_HEIGHT, SUBCHUNK_LENGTH))
+		shape = tuple(end - start)
+
+		# faces are lit the same way if all their corners are, and if they're all lit like those of the other face
+
+		materials = self.face_materials[numbers, faces]
+		mergeable = (materials >= 0) & (corners == corners[:, :1]).all(axis=(1, 2))
+
+		_, keys = np.unique(np.column_stack((materials, corners[:, 0])), axis=0, return_inverse=True)
+		keys = np.where(mergeable, keys.reshape(-1), -1)
+
+		unmerged = ~mergeable
+		merged = [(positions[unmerged], numbers[unmerged], faces[unmerged], corners[unmerged])]
+		extents = [np.zeros((np.count_nonzero(unmerged), 3), dtype=np.int64)]
+
+		for face, (a, b) in enumerate(FACE_AXES):
+			selected = np.nonzero(mergeable & (faces == face))[0]
+
+			if not len(selected):
+				continue
+
+			# lay the faces out on a grid, with the normal axis first, then the second and the first merging axes
+
+			grid = np.full(shape, -1, dtype=np.int64)
+			records = np.zeros(shape, dtype=np.int64)
+
+			cells = tuple((positions[selected] - start).T)
+			grid[cells] = keys[selected]
+			records[cells] = selected
+
+			axes = (3 - a - b, b, a)
+			grid = grid.transpose(axes)
+			records = records.transpose(axes)
+
+			a_boundaries = (start[a] + np.arange(shape[a])) % subchunk_size[a] == 0
+			b_boundaries = (start[b] + np.arange(shape[b])) % subchunk_size[b] == 0
+
+			# runs along the first axis
+
+			previous = np.full_like(grid, -1)
+			previous[:, :, 1:] = grid[:, :, :-1]
+
+			run_starts = (grid >= 0) & (a_boundaries | (grid != previous))
+			run_ids = np.cumsum(run_starts).reshape(grid.shape) - 1
+			run_lengths = np.bincount(run_ids[grid >= 0])
+			lengths = np.where(run_starts, run_lengths[run_ids], 0)
+
+			# runs continuing the one right before them along the second axis
+
+			previous = np.full_like(grid, -1)
+			previous[:, 1:, :] = np.where(run_starts, grid, -1)[:, :-1, :]
+
+			previous_lengths = np.zeros_like(lengths)
+			previous_lengths[:, 1:, :] = lengths[:, :-1, :]
+
+			continued = run_starts & ~b_boundaries[:, np.newaxis] & (grid == previous) & (lengths == previous_lengths)
+			face_starts = run_starts & ~continued
+
+			# walk along the second axis to count how many runs each merged face is made of
+
+			chain_ids = np.cumsum(face_starts.transpose(0, 2, 1)).reshape(grid.transpose(0, 2, 1).shape) - 1
+			chain_lengths = np.bincount(chain_ids[run_starts.transpose(0, 2, 1)])
+			chain_ids = chain_ids.transpose(0, 2, 1)
+
+			cells = np.nonzero(face_starts)
+			face_records = records[cells]
+
+			face_positions = np.empty((len(face_records), 3), dtype=np.int64)
+			face_extents = np.zeros((len(face_records), 3), dtype=np.int64)
+
+			for i, axis in enumerate(axes):
+				face_positions[:, axis] = cells[i] + start[axis]
+
+			face_extents[:, a] = lengths[cells] - 1
+			face_extents[:, b] = chain_lengths[chain_ids[cells]] - 1
+
+			merged.append((face_positions, numbers[face_records], faces[face_records], corners[face_records]))
+			extents.append(face_extents)
+
+		return (*(np.concatenate(arrays) for arrays in zip(*merged)), np.concatenate(extents))
+
+	def build_vertices(self, positions, numbers, faces, corners, extents):
+		# interleaved vertex data of the faces, shaped (face, vertex, attribute)
+		# merged faces are stretched along their extents, their vertices on the positive side being moved over
+
+		vertices = np.empty((len(numbers), 4, VERTEX_SIZE))
+		vertex_positions = self.vertex_positions[numbers, faces]
+		uv_modes = np.where(extents.any(axis=1), faces + 1, 0)
+
+		vertices[:, :, 0:3] = (
+			vertex_positions
+			+ positions[:, np.newaxis, :]
+			+ np.where(vertex_positions > 0, extents[:, np.newaxis, :], 0)
+		)
+		vertices[:, :, 3] = (
+			self.tex_indices[numbers, faces][:, np.newaxis] * 4
+			+ np.arange(4)
+			+ (uv_modes << UV_MODE_SHIFT)[:, np.newaxis]
+		)
+		vertices[:, :, 4:7] = corners
+
+		return vertices.astype(np.float32)
+
+	def find_lod_faces(self, snapshot, lod):
+		"""Every face to render in the chunk of 'snapshot' at level of detail 'lod', the chunk being downsampled into
+		cells of 2 ** 'lod' blocks along each axis (see 'Chunk_snapshot.downsample') which are meshed as larger cubes
+		Returns the same arrays as 'merge_faces', the positions being those of the lowest block of each cell"""
+
+		scale = 1 << lod
+		cell_snapshot = snapshot.downsample(scale, self.cube_blocks)
+		end = (CHUNK_WIDTH // scale, CHUNK_HEIGHT // scale, CHUNK_LENGTH // scale)
+
+		positions, numbers, faces, lights = self.find_faces(cell_snapshot, (0, 0, 0), end)
+		corners = self.light_faces(cell_snapshot, positions, numbers, faces, lights, False)
+
+		# cells are stretched over all their blocks, which also makes the shader tile their textures
+
+		return positions * scale, numbers, faces, corners, np.full_like(positions, scale - 1)
+
+	def mesh_subchunks(self, snapshot, subchunk_positions, greedy=False, smooth=False, lod=0):
+		"""Meshes of the subchunks at 'subchunk_positions' in the chunk of 'snapshot', with faces merged if 'greedy'
+		and with smooth lighting and ambient occlusion if 'smooth', or at level of detail 'lod' if it isn't 0
+		(in which case faces are neither merged nor smoothly lit)
+		Returns a dictionary of (opaque mesh, translucent mesh, face count) tuples, the meshes being flat
+		'numpy.float32' vertex arrays, and the face count the number of block faces they cover"""
+
+		requested = np.zeros(SUBCHUNK_COUNTS, dtype=bool)
+		requested[tuple(np.transpose(subchunk_positions))] = True
+
+		requested_positions = np.transpose(np.nonzero(requested))
+		subchunk_size = np.array((SUBCHUNK_WIDTH, SUBCHUNK_HEIGHT, SUBCHUNK_LENGTH))
+
+		if lod:
+			positions, numbers, faces, corners, extents = self.find_lod_faces(snapshot, lod)
+			kept = requested[tuple((positions // subchunk_size).T)]
+			positions, numbers, faces, corners, extents = (
+				array[kept] for array in (positions, numbers, faces, corners, extents)
+			)
+
+			covered_faces = np.full(len(faces), (1 << lod) ** 2)  # a cell's face covers a whole side of it
+
+		else:
+			# only look at the blocks in the bounding box of the requested subchunks
+
+			start = requested_positions.min(axis=0) * subchunk_size
+			end = (requested_positions.max(axis=0) + 1) * subchunk_size
+
+			positions, numbers, faces, lights = self.find_faces(snapshot, start, end)
+			kept = requested[tuple((positions // subchunk_size).T)]
+			positions, numbers, faces, lights = positions[kept], numbers[kept], faces[kept], lights[kept]
+
+			corners = self.light_faces(snapshot, positions, numbers, faces, lights, smooth)
+
+			if greedy:
+				positions, numbers, faces, corners, extents = self.merge_faces(
+					positions, numbers, faces, corners, start, end
+				)
+			else:
+				extents = np.zeros_like(positions)
+
+			covered_faces = np.prod(extents + 1, axis=1)
+
+		# order the faces like the subchunk meshers would: by subchunk, then by block (x, then y, then z),
+		# then by face index
+
+		subchunk_indices = np.ravel_multi_index(tuple((positions // subchunk_size).T), SUBCHUNK_COUNTS)
+		block_indices = np.ravel_multi_index(tuple((positions % subchunk_size).T), tuple(subchunk_size))
+		order = np.argsort((subchunk_indices * subchunk_size.prod() + block_indices) * MAX_FACES + faces)
+
+		subchunk_indices = subchunk_indices[order]
+		numbers = numbers[order]
+		extents = extents[order]
+
+		vertices = self.build_vertices(positions[order], numbers, faces[order], corners[order], extents)
+		translucent = self.translucent_blocks[numbers]
+
+		face_counts = np.concatenate(((0,), np.cumsum(covered_faces[order])))
+
+		# split the faces up by subchunk and by mesh
+
+		meshes = {}
+		bounds = np.searchsorted(subchunk_indices, np.arange(requested.size + 1))
+
+		for subchunk_position in subchunk_positions:
+			subchunk_index = np.ravel_multi_index(subchunk_position, SUBCHUNK_COUNTS)
+			first, last = bounds[subchunk_index], bounds[subchunk_index + 1]
+
+			subchunk_vertices = vertices[first:last]
+			subchunk_translucent = translucent[first:last]
+
+			meshes[subchunk_position] = (
+				subchunk_vertices[~subchunk_translucent].ravel(),
+				subchunk_vertices[subchunk_translucent].ravel(),
+				int(face_counts[last] - face_counts[first]),
+			)
+
+		return meshes
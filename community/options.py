@@ -21,6 +21,53 @@ ADVANCED_OPENGL = False  # Not recommended unless using NVIDIA cards.
 # Max number of chunk updates per chunk every tick
 CHUNK_UPDATES = 4
 
+# Vectorized meshing
+VECTORIZED_MESHING = True  # Meshes all the pending subchunks of a chunk at once with numpy, rather than block by block.
+# Much faster, especially when loading the world, above all with smooth lighting
+
+# Mesh workers
+MESH_WORKERS = 0  # Number of background processes running the vectorized mesher (0 meshes on the main thread).
+# Keeps chunk updates from stalling the game, especially when loading the world.
+# A good value is a couple less than the number of CPU cores
+
+# Greedy meshing
+GREEDY_MESHING = False  # Merges adjacent block faces which look the same into larger faces, tiling their texture.
+# Makes for far fewer vertices to store and draw, so longer render distances.
+# Requires vectorized meshing. With smooth lighting, only faces lit evenly on all their corners are merged
+
+# Packed vertices
+PACKED_VERTICES = False  # Packs every vertex into 8 bytes instead of 28 (7 floats).
+# Cuts the memory used by chunk meshes and the time it takes to upload them, at the cost of a few bit operations
+# per vertex in the vertex shader. Diagonal models (plants, ...) may look a hair thinner
+
+# Level of detail
+LOD_DISTANCES = ()  # Distances (in chunks) past which chunks are meshed at a lower level of detail, from cells of
+# 2x2x2 blocks past the first one and of 4x4x4 blocks past the second, e.g. (8, 16). Empty for full detail everywhere.
+# Allows for much larger render distances with the same number of quads. Uses the vectorized mesher for those chunks
+LOD_HYSTERESIS = 1  # How far (in chunks) past one of these distances chunks need to be to switch level of detail,
+# so that chunks right at the distance don't keep switching back and forth
+
+# Incremental uploads
+INCREMENTAL_UPLOADS = False  # Gives each subchunk its own range of its chunk's vertex buffer, so that only
+# the subchunks which changed are uploaded again, rather than the whole chunk. Chunks are then drawn with multi-draw
+# calls over these ranges. Works with direct and indirect rendering; ignored when WORLD_BUFFER is on
+
+# Staging buffer
+STAGING_BUFFER = False  # Writes vertex data straight into a ring buffer which stays mapped in memory,
+# from which the GPU copies it over to the chunk buffers on its own, rather than having the driver copy it on every
+# upload. Requires OpenGL 4.4+, vertex data is uploaded directly otherwise
+
+# World buffer
+WORLD_BUFFER = False  # Puts the meshes of every chunk in one large buffer, and draws all the chunks of each pass
+# (opaque, then translucent) with a single multi-draw indirect call, rather than with one or two draw calls per chunk.
+# Chunks are uploaded whole and can't be occlusion culled, so incremental uploads and advanced OpenGL are ignored.
+# Requires OpenGL 4.3+, chunks are drawn one by one otherwise (see indirect rendering)
+
+# Paletted block storage
+PALETTED_STORAGE = False  # Stores the blocks of each chunk section as a palette and bit-packed indices into it.
+# Uses a fraction of the memory, which allows for much larger render distances,
+# but every block access is slower, so chunk updates / building will take longer
+
 # Vertical Sync
 VSYNC = False
 
@@ -41,10 +88,11 @@ SMOOTH_FPS = False  # Legacy way to force the flushing of command buffer and for
 SMOOTH_LIGHTING = True  # Smooth Lighting smoothes the light of each vertex to achieve a linear interpolation
 # of light on each fragment, hence creating a smoother light effect
 # It also adds ambient occlusion, to simulate light blocked by opaqua objects
-# Chunk updates / building will be severely affecteds by this feature
+# Chunk updates / building will be severely affecteds by this feature, unless vectorized meshing is on
 
 # Better Translucency blending
-FANCY_TRANSLUCENCY = True
+FANCY_TRANSLUCENCY = True  # Sorts the translucent faces of each chunk back to front (again whenever the camera moves
+# to another block), so that they blend correctly
 
 # Minification Filter
 MIPMAP_TYPE = gl.GL_NEAREST  # Linear filtering samples the texture in a bilinear way in the distance,
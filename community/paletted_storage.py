@@ -0,0 +1,165 @@
+import array
+
+# Palette-compressed block storage, meant as a drop-in replacement for the flat block array of a chunk
+# The columns of the chunk are cut into sections, each of which keeps a palette of the block numbers it contains
+# and a bit-packed array of indices into that palette, only as wide as the palette needs
+# Sections only containing a single block number don't need the index array at all
+
+WORD_BITS = 64
+
+
+class Paletted_section:
+	__slots__ = ("size", "palette", "palette_indices", "bits", "mask", "per_word", "data")
+
+	def __init__(self, size, number=0):
+		self.size = size
+		self.fill_uniform(number)
+
+	def fill_uniform(self, number):
+		self.palette = [number]
+		self.palette_indices = {number: 0}
+		self.pack(None, 0)
+
+	def fill(self, blocks):
+		# 'blocks' is a bytes-like object containing the block number of every block in the section
+
+		self.palette = sorted(set(blocks))
+		self.palette_indices = {number: i for i, number in enumerate(self.palette)}
+
+		if len(self.palette) == 1:
+			self.pack(None, 0)
+			return
+
+		table = bytearray(256)
+		for number, palette_index in self.palette_indices.items():
+			table[number] = palette_index
+
+		self.pack(bytes(blocks).translate(table), (len(self.palette) - 1).bit_length())
+
+	def pack(self, indices, bits):
+		self.bits = bits
+		self.mask = (1 << bits) - 1
+
+		if not bits:
+			self.per_word = 0
+			self.data = None
+			return
+
+		# indices never straddle two words, so there may be a few unused bits at the top of each word
+
+		self.per_word = WORD_BITS // bits
+		self.data = array.array("Q", bytes(8 * -(-self.size // self.per_word)))
+
+		for word in range(len(self.data)):
+			value = 0
+			for slot, palette_index in enumerate(indices[word * self.per_word : (word + 1) * self.per_word]):
+				value |= palette_index << (slot * bits)
+			self.data[word] = value
+
+	def unpack(self):
+		if not self.bits:
+			return bytes(self.size)
+
+		indices = bytearray()
+		shifts = range(0, self.per_word * self.bits, self.bits)
+
+		for word in self.data:
+			indices += bytes((word >> shift) & self.mask for shift in shifts)
+
+		return bytes(indices[: self.size])
+
+	def get(self, index):
+		if not self.bits:
+			return self.palette[0]
+
+		word, slot = divmod(index, self.per_word)
+		return self.palette[(self.data[word] >> (slot * self.bits)) & self.mask]
+
+	def set(self, index, number):
+		palette_index = self.palette_indices.get(number, None)
+
+		if palette_index is None:
+			palette_index = len(self.palette)
+			self.palette.append(number)
+			self.palette_indices[number] = palette_index
+
+			if palette_index > self.mask:  # palette outgrew the index width, repack everything one bit wider
+				self.pack(self.unpack(), palette_index.bit_length())
+
+		elif not self.bits:  # the section is uniform and already made of this block
+			return
+
+		word, slot = divmod(index, self.per_word)
+		shift = slot * self.bits
+		self.data[word] = (self.data[word] & ~(self.mask << shift)) | (palette_index << shift)
+
+	def __bytes__(self):
+		if not self.bits:
+			return bytes((self.palette[0],)) * self.size
+
+		table = bytearray(256)
+		table[: len(self.palette)] = self.palette
+
+		return self.unpack().translate(table)
+
+
+class Paletted_storage:
+	"""Indexed exactly like the flat block array of a chunk (a column of 'column_height' blocks after another),
+	but stored as a stack of 'section_height' high paletted sections"""
+
+	def __init__(self, column_count, column_height, section_height=16):
+		self.column_count = column_count
+		self.column_height = column_height
+		self.section_height = section_height
+
+		self.sections = [
+			Paletted_section(column_count * section_height) for _ in range(column_height // section_height)
+		]
+
+	def __len__(self):
+		return self.column_count * self.column_height
+
+	def __getitem__(self, index):
+		column, y = divmod(index, self.column_height)
+		section, local_y = divmod(y, self.section_height)
+
+		return self.sections[section].get(column * self.section_height + local_y)
+
+	def __setitem__(self, index, number):
+		if isinstance(index, slice):
+			if index != slice(None):
+				raise IndexError("Paletted storage only supports replacing all of its blocks at once")
+
+			self.fill(number)
+			return
+
+		column, y = divmod(index, self.column_height)
+		section, local_y = divmod(y, self.section_height)
+
+		self.sections[section].set(column * self.section_height + local_y, number)
+
+	def __iter__(self):
+		return iter(bytes(self))
+
+	def fill(self, blocks):
+		blocks = memoryview(bytes(blocks))
+
+		for i, section in enumerate(self.sections):
+			start = i * self.section_height
+			section.fill(
+				b"".join(
+					blocks[column + start : column + start + self.section_height]
+					for column in range(0, len(self), self.column_height)
+				)
+			)
+
+	def __bytes__(self):
+		# interleave the sections back into columns
+
+		section_blocks = [memoryview(bytes(section)) for section in self.sections]
+
+		return b"".join(
+			blocks[column : column + self.section_height]
+			for column in range(0, self.column_count * self.section_height, self.section_height)
+			for blocks in section_blocks
+		)
@@ -34,14 +34,12 @@ class Save:
 
 		# create chunk and fill it with the blocks from our chunk file
 
-		self.world.chunks[glm.ivec3(chunk_position)] = chunk.Chunk(self.world, glm.ivec3(chunk_position))
+		# the chunk stores its blocks with the same stride as the chunk file, so we can copy them over directly
 
-		for x in range(chunk.CHUNK_WIDTH):
-			for y in range(chunk.CHUNK_HEIGHT):
-				for z in range(chunk.CHUNK_LENGTH):
-					self.world.chunks[glm.ivec3(chunk_position)].blocks[x][y][z] = chunk_blocks[
-						x * chunk.CHUNK_LENGTH * chunk.CHUNK_HEIGHT + z * chunk.CHUNK_HEIGHT + y
-					]
+		loaded_chunk = chunk.Chunk(self.world, glm.ivec3(chunk_position))
+		loaded_chunk.set_blocks(chunk_blocks.tobytes())
+
+		self.world.add_chunk(loaded_chunk)
 
 	def save_chunk(self, chunk_position):
 		logging.debug(f"Saving chunk at position {chunk_position}")
@@ -63,14 +61,7 @@ class Save:
 
 		# fill the chunk file with the blocks from our chunk
 
-		chunk_blocks = nbt.ByteArray([0] * (chunk.CHUNK_WIDTH * chunk.CHUNK_HEIGHT * chunk.CHUNK_LENGTH))
-
-		for x in range(chunk.CHUNK_WIDTH):
-			for y in range(chunk.CHUNK_HEIGHT):
-				for z in range(chunk.CHUNK_LENGTH):
-					chunk_blocks[x * chunk.CHUNK_LENGTH * chunk.CHUNK_HEIGHT + z * chunk.CHUNK_HEIGHT + y] = (
-						self.world.chunks[chunk_position].blocks[x][y][z]
-					)
+		chunk_blocks = nbt.ByteArray(bytearray(self.world.chunks[chunk_position].get_blocks()))
 
 		# save the chunk file
 
@@ -93,10 +84,20 @@ class Save:
 		#  		self.load_chunk((x, 0, y))
 
 		for chunk_position, unlit_chunk in self.world.chunks.items():
-			for x in range(chunk.CHUNK_WIDTH):
-				for y in range(chunk.CHUNK_HEIGHT):
-					for z in range(chunk.CHUNK_LENGTH):
-						if unlit_chunk.blocks[x][y][z] in self.world.light_blocks:
+			blocks = unlit_chunk.get_blocks()
+
+			for section, uniform_number in enumerate(unlit_chunk.uniform_sections):
+				# sections made of a single block (e.g. air) can only contain light sources if that block is one
+
+				if uniform_number is not None and not self.world.light_source_blocks[uniform_number]:
+					continue
+
+				start = section * chunk.SECTION_HEIGHT
+
+				for column in range(0, len(blocks), chunk.CHUNK_HEIGHT):
+					for index in range(column + start, column + start + chunk.SECTION_HEIGHT):
+						if self.world.light_source_blocks[blocks[index]]:
+							x, y, z = chunk.get_block_position(index)
 							world_pos = glm.ivec3(
 								chunk_position[0] * chunk.CHUNK_WIDTH + x,
 								chunk_position[1] * chunk.CHUNK_HEIGHT + y,
@@ -9,11 +9,13 @@ class Shader_error(Exception):
 		self.message = message
 
 
-def create_shader(target, source_path):
-	# read shader source
+def create_shader(target, source_path, defines=()):
+	# read shader source, and define the requested macros right after the version directive
 
 	with open(source_path, "rb") as source_file:
-		source = source_file.read()
+		version, source = source_file.read().split(b"\n", 1)
+
+	source = b"\n".join([version, *(f"#define {define}".encode() for define in defines), source])
 
 	source_length = ctypes.c_int(len(source) + 1)
 	source_buffer = ctypes.create_string_buffer(source)
@@ -40,19 +42,19 @@ def create_shader(target, source_path):
 
 
 class Shader:
-	def __init__(self, vert_path, frag_path):
+	def __init__(self, vert_path, frag_path, defines=()):
 		self.program = gl.glCreateProgram()
 
 		# create vertex shader
 
 		self.vert_shader = gl.glCreateShader(gl.GL_VERTEX_SHADER)
-		create_shader(self.vert_shader, vert_path)
+		create_shader(self.vert_shader, vert_path, defines)
 		gl.glAttachShader(self.program, self.vert_shader)
 
 		# create fragment shader
 
 		self.frag_shader = gl.glCreateShader(gl.GL_FRAGMENT_SHADER)
-		create_shader(self.frag_shader, frag_path)
+		create_shader(self.frag_shader, frag_path, defines)
 		gl.glAttachShader(self.program, self.frag_shader)
 
 		# link program and clean up
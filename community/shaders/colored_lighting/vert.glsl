@@ -3,16 +3,57 @@
 #define CHUNK_WIDTH 16
 #define CHUNK_LENGTH 16
 
+#ifdef WORLD_BUFFER
+
+// all chunks are drawn at once, every draw fetching the position of its chunk from the instance it starts at
+
+layout(location = 5) in ivec2 a_ChunkPosition;
+#define u_ChunkPosition a_ChunkPosition
+
+#else
+
 uniform ivec2 u_ChunkPosition;
+
+#endif
+
 uniform mat4 u_MVPMatrix;
 uniform float u_Daylight;
 
+#ifdef PACKED_VERTICES
+
+// vertices packed into two integers, see 'vertex_format.py' for the layout
+
+layout(location = 0) in uvec2 a_PackedVertex;
+
+vec3 a_LocalPosition;
+float a_TextureFetcher;
+float a_Shading;
+float a_Light;
+float a_Skylight;
+
+void unpackVertex() {
+	a_LocalPosition = vec3(
+		a_PackedVertex.x & 0x3FFu,
+		(a_PackedVertex.x >> 10) & 0xFFFu,
+		a_PackedVertex.x >> 22
+	) / vec3(32.0, 16.0, 32.0) - 1.0;
+
+	a_TextureFetcher = float(a_PackedVertex.y & 0x1FFFu);
+	a_Shading = float((a_PackedVertex.y >> 13) & 0x3Fu) / 40.0;
+	a_Light = float((a_PackedVertex.y >> 19) & 0x3Fu) / 4.0;
+	a_Skylight = float(a_PackedVertex.y >> 25) / 4.0;
+}
+
+#else
+
 layout(location = 0) in vec3 a_LocalPosition;
 layout(location = 1) in float a_TextureFetcher;
 layout(location = 2) in float a_Shading;
 layout(location = 3) in float a_Light;
 layout(location = 4) in float a_Skylight;
 
+#endif
+
 out vec3 v_Position;
 out vec3 v_TexCoords;
 out vec3 v_Light;
@@ -24,11 +65,45 @@ const vec2 texture_UV[4] = vec2[4](
 	vec2(1.0, 1.0)
 );
 
+// axes along which the texture of each face runs, used to tile it over faces merged by the greedy mesher
+
+const vec3 face_U[6] = vec3[6](
+	vec3( 0.0, 0.0, -1.0),
+	vec3( 0.0, 0.0,  1.0),
+	vec3(-1.0, 0.0,  0.0),
+	vec3( 1.0, 0.0,  0.0),
+	vec3( 1.0, 0.0,  0.0),
+	vec3(-1.0, 0.0,  0.0)
+);
+
+const vec3 face_V[6] = vec3[6](
+	vec3(0.0, 1.0, 0.0),
+	vec3(0.0, 1.0, 0.0),
+	vec3(0.0, 0.0, 1.0),
+	vec3(0.0, 0.0, 1.0),
+	vec3(0.0, 1.0, 0.0),
+	vec3(0.0, 1.0, 0.0)
+);
+
 void main(void) {
+#ifdef PACKED_VERTICES
+	unpackVertex();
+#endif
+
 	v_Position = vec3(u_ChunkPosition.x * CHUNK_WIDTH + a_LocalPosition.x, 
 						a_LocalPosition.y, 
 						u_ChunkPosition.y * CHUNK_LENGTH + a_LocalPosition.z);
-	v_TexCoords = vec3(texture_UV[int(a_TextureFetcher) & 3], int(a_TextureFetcher) >> 2);
+	int textureFetcher = int(a_TextureFetcher);
+	int uvMode = textureFetcher >> 10; // 0 for regular faces, face index + 1 for merged faces
+
+	vec2 uv = texture_UV[textureFetcher & 3];
+
+	if (uvMode > 0) { // block corners are at half coordinates, so their texture coordinates are whole numbers
+		vec3 cornerPosition = a_LocalPosition + 0.5;
+		uv = vec2(dot(cornerPosition, face_U[uvMode - 1]), dot(cornerPosition, face_V[uvMode - 1]));
+	}
+
+	v_TexCoords = vec3(uv, (textureFetcher >> 2) & 0xFF);
 
 	float blocklightMultiplier = pow(0.8, 15.0 - a_Light);
 	float skylightMultiplier = pow(0.8, 15.0 - a_Skylight);
@@ -0,0 +1,109 @@
+import ctypes
+from collections import deque
+
+import numpy as np
+import pyglet.gl as gl
+
+# Ring buffer through which vertex data is uploaded, kept mapped in client memory for as long as it lives (OpenGL 4.4+)
+# Data is written straight into the mapped memory, and then copied over to its actual buffer by the GPU itself
+# The GPU may not have made these copies yet for what was written during the last few frames, so every frame ends
+# with a fence, and what a frame wrote is only written over once its fence is signaled
+
+STAGING_BUFFER_SIZE = 1 << 23  # 8 MiB
+
+MAP_FLAGS = gl.GL_MAP_WRITE_BIT | gl.GL_MAP_PERSISTENT_BIT | gl.GL_MAP_COHERENT_BIT
+
+WAIT_TIMEOUT = 1000000000  # in nanoseconds
+
+
+def overlaps(ranges, start, end):
+	return any(range_start < end and start < range_end for range_start, range_end in ranges)
+
+
+class Staging_buffer:
+	def __init__(self, size=STAGING_BUFFER_SIZE):
+		self.size = size
+		self.head = 0  # where the next data is written
+
+		self.frame_ranges = []  # ranges written during the current frame
+		self.frames = deque()  # fences of the previous frames, along with the ranges they wrote
+
+		self.buffer = gl.GLuint(0)
+		gl.glGenBuffers(1, self.buffer)
+		gl.glBindBuffer(gl.GL_COPY_READ_BUFFER, self.buffer)
+		gl.glBufferStorage(gl.GL_COPY_READ_BUFFER, size, None, MAP_FLAGS)
+
+		address = gl.glMapBufferRange(gl.GL_COPY_READ_BUFFER, 0, size, MAP_FLAGS)
+		self.memory = (ctypes.c_ubyte * size).from_address(address)
+
+	def delete(self):
+		for fence, _ in self.frames:
+			gl.glDeleteSync(fence)
+
+		gl.glBindBuffer(gl.GL_COPY_READ_BUFFER, self.buffer)
+		gl.glUnmapBuffer(gl.GL_COPY_READ_BUFFER)
+		gl.glDeleteBuffers(1, self.buffer)
+
+	def reserve(self, size):
+		"""Offset of a range of 'size' bytes which is safe to write to, None if the buffer isn't large enough"""
+
+		if size > self.size:
+			return None
+
+		start = self.head if self.head + size <= self.size else 0
+		end = start + size
+
+		# wait for the GPU to be done with whatever was last written there, even if it was during this frame
+
+		if overlaps(self.frame_ranges, start, end):
+			self.end_frame()
+
+		while any(overlaps(ranges, start, end) for _, ranges in self.frames):
+			self.wait_frame()
+
+		if self.frame_ranges and self.frame_ranges[-1][1] == start:
+			self.frame_ranges[-1][1] = end
+		else:
+			self.frame_ranges.append([start, end])
+
+		self.head = end
+		return start
+
+	def upload(self, buffer, offset, values, dtype):
+		"""Copy 'values' (a sequence of numbers) over to 'buffer' at 'offset' (in bytes), stored as 'dtype'
+		Returns their size in bytes, or None if they don't fit in the staging buffer (nothing is copied then)"""
+
+		size = len(values) * np.dtype(dtype).itemsize
+		start = self.reserve(size)
+
+		if start is None:
+			return None
+
+		if not size:
+			return 0
+
+		np.frombuffer(self.memory, dtype, len(values), start)[:] = values
+
+		gl.glBindBuffer(gl.GL_COPY_READ_BUFFER, self.buffer)
+		gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, buffer)
+		gl.glCopyBufferSubData(gl.GL_COPY_READ_BUFFER, gl.GL_COPY_WRITE_BUFFER, start, offset, size)
+
+		return size
+
+	def end_frame(self):
+		# fence off what was written during the frame, and forget about the frames the GPU is done with
+
+		if self.frame_ranges:
+			self.frames.append((gl.glFenceSync(gl.GL_SYNC_GPU_COMMANDS_COMPLETE, 0), self.frame_ranges))
+			self.frame_ranges = []
+
+		while self.frames and gl.glClientWaitSync(self.frames[0][0], 0, 0) in (
+			gl.GL_ALREADY_SIGNALED,
+			gl.GL_CONDITION_SATISFIED,
+		):
+			gl.glDeleteSync(self.frames.popleft()[0])
+
+	def wait_frame(self):
+		fence, _ = self.frames.popleft()
+		gl.glClientWaitSync(fence, gl.GL_SYNC_FLUSH_COMMANDS_BIT, WAIT_TIMEOUT)
+		gl.glDeleteSync(fence)
@@ -1,5 +1,8 @@
+from array import array
+
 from util import *
 import glm
+import numpy as np
 from functools import lru_cache as cache
 
 SUBCHUNK_WIDTH = 4
@@ -47,12 +50,14 @@ class Subchunk:
 
 		# mesh variables
 
-		self.mesh = []
+		self.mesh = array("f")
 		self.mesh_array = None
 
-		self.translucent_mesh = []
+		self.translucent_mesh = array("f")
 		self.translucent_mesh_array = None
 
+		self.face_count = 0
+
 	def get_raw_light(self, pos, npos):
 		if not npos:
 			light_levels = self.world.get_light(pos)
@@ -153,7 +158,7 @@ class Subchunk:
 		return neighbours
 
 	def get_light_smooth(self, block, face, pos, npos):
-		if not npos or block in self.world.light_blocks:
+		if not npos or self.world.light_source_blocks[block]:
 			return [self.world.get_light(pos)] * 4
 
 		neighbours = self.get_neighbour_voxels(npos, face)
@@ -163,7 +168,7 @@ class Subchunk:
 		return self.get_smooth_face_light(self.world.get_light(npos), *nlights)
 
 	def get_skylight_smooth(self, block, face, pos, npos):
-		if not npos or block in self.world.light_blocks:
+		if not npos or self.world.light_source_blocks[block]:
 			return [self.world.get_skylight(pos)] * 4
 
 		neighbours = self.get_neighbour_voxels(npos, face)
@@ -174,7 +179,7 @@ class Subchunk:
 
 	def get_ambient(self, block, block_type, face, npos):
 		raw_shading = block_type.shading_values[face]
-		if not block_type.is_cube or block in self.world.light_blocks:
+		if not self.world.cube_blocks[block] or self.world.light_source_blocks[block]:
 			return raw_shading
 
 		neighbours = self.get_neighbour_voxels(npos, face)
@@ -214,31 +219,46 @@ class Subchunk:
 		lights = self.get_light(block, face, pos, npos)
 		skylights = self.get_skylight(block, face, pos, npos)
 
-		if block_type.model.translucent:
+		if self.world.translucent_blocks[block]:
 			mesh = self.translucent_mesh
 		else:
 			mesh = self.mesh
 
 		for i in range(4):
-			mesh += [
-				vertex_positions[i * 3 + 0] + lx,
-				vertex_positions[i * 3 + 1] + ly,
-				vertex_positions[i * 3 + 2] + lz,
-				tex_index * 4 + i,
-				shading[i],
-				lights[i],
-				skylights[i],
-			]
+			mesh.extend(
+				(
+					vertex_positions[i * 3 + 0] + lx,
+					vertex_positions[i * 3 + 1] + ly,
+					vertex_positions[i * 3 + 2] + lz,
+					tex_index * 4 + i,
+					shading[i],
+					lights[i],
+					skylights[i],
+				)
+			)
+
+	def add_model(self, pos, lpos, block, block_type):
+		# models other than cubes have all their faces rendered and lit evenly with the block's own light levels,
+		# regardless of smooth lighting, so the block type's vertex template only has to be moved and lit
+
+		if self.world.translucent_blocks[block]:
+			mesh = self.translucent_mesh
+		else:
+			mesh = self.mesh
 
-	def can_render_face(self, block_type, block_number, position):
-		return not (
-			self.world.is_opaque_block(position)
-			or (block_type.glass and self.world.get_block_number(position) == block_number)
-		)
+		offset = (*lpos, 0, 0, self.world.get_light(pos), self.world.get_skylight(pos))
+		mesh.frombytes((block_type.vertex_template + offset).astype(np.float32).tobytes())
+
+	def can_render_face(self, block_number, position):
+		return self.world.face_visibility[block_number << 8 | self.world.get_block_number(position)]
 
 	def update_mesh(self):
-		self.mesh = []
-		self.translucent_mesh = []
+		self.mesh = array("f")
+		self.translucent_mesh = array("f")
+		self.face_count = 0
+
+		if self.parent.is_subchunk_empty(self):
+			return
 
 		for local_x in range(SUBCHUNK_WIDTH):
 			for local_y in range(SUBCHUNK_HEIGHT):
@@ -247,7 +267,7 @@ class Subchunk:
 					parent_ly = self.local_position[1] + local_y
 					parent_lz = self.local_position[2] + local_z
 
-					block_number = self.parent.blocks[parent_lx][parent_ly][parent_lz]
+					block_number = self.parent.get_block_number((parent_lx, parent_ly, parent_lz))
 
 					parent_lpos = glm.ivec3(parent_lx, parent_ly, parent_lz)
 
@@ -262,12 +282,13 @@ class Subchunk:
 						# if block isn't a cube, we just want to render all faces, regardless of neighbouring blocks
 						# since the vast majority of blocks are probably anyway going to be cubes, this won't impact performance all that much; the amount of useless faces drawn is going to be minimal
 
-						if block_type.is_cube:
+						if self.world.cube_blocks[block_number]:
 							for face, direction in enumerate(DIRECTIONS):
 								npos = pos + direction
-								if self.can_render_face(block_type, block_number, npos):
+								if self.can_render_face(block_number, npos):
 									self.add_face(face, pos, parent_lpos, block_number, block_type, npos)
 
 						else:
-							for i in range(len(block_type.vertex_positions)):
-								self.add_face(i, pos, parent_lpos, block_number, block_type)
+							self.add_model(pos, parent_lpos, block_number, block_type)
+
+		self.face_count = (len(self.mesh) + len(self.translucent_mesh)) // 28
@@ -0,0 +1,78 @@
+import ctypes
+
+import numpy as np
+import pyglet.gl as gl
+
+# Chunk meshes are built as 7 floats per vertex:
+# x, y, z (local position), texture fetcher, shading, block light, skylight
+# They're uploaded as such by default, but can also be packed into 2 unsigned 32-bit integers per vertex:
+#
+# first integer:  x (10 bits) | y (12 bits) | z (10 bits)
+# second integer: texture fetcher (13 bits) | shading (6 bits) | block light (6 bits) | skylight (6 bits)
+#
+# Positions are stored offset by a block, in 1/32ths of a block horizontally (diagonal models like plants aren't
+# on the 1/16th grid of other models) and in 1/16ths of a block vertically
+# Shading is stored in 1/40ths, which is exact for every product of a face's shading and ambient occlusion factor,
+# and light levels are stored in quarters, which is exact for the averages smooth lighting makes
+
+FLOAT_VERTEX_SIZE = 7
+FLOAT_VERTEX_BYTES = FLOAT_VERTEX_SIZE * 4
+PACKED_VERTEX_BYTES = 8
+
+POSITION_OFFSET = 1
+POSITION_SCALES = (32, 16, 32)
+
+SHADING_SCALE = 40
+LIGHT_SCALE = 4
+
+
+def get_vertex_bytes(options):
+	return PACKED_VERTEX_BYTES if options.PACKED_VERTICES else FLOAT_VERTEX_BYTES
+
+
+def set_vertex_attributes(options):
+	# vertex attributes of the VBO bound to GL_ARRAY_BUFFER, for the bound VAO
+
+	if options.PACKED_VERTICES:
+		gl.glVertexAttribIPointer(0, 2, gl.GL_UNSIGNED_INT, PACKED_VERTEX_BYTES, 0)
+		gl.glEnableVertexAttribArray(0)
+	else:
+		set_float_vertex_attributes()
+
+
+def set_float_vertex_attributes():
+	gl.glVertexAttribPointer(0, 3, gl.GL_FLOAT, gl.GL_FALSE, 7 * ctypes.sizeof(gl.GLfloat), 0)
+	gl.glEnableVertexAttribArray(0)
+	gl.glVertexAttribPointer(
+		1, 1, gl.GL_FLOAT, gl.GL_FALSE, 7 * ctypes.sizeof(gl.GLfloat), 3 * ctypes.sizeof(gl.GLfloat)
+	)
+	gl.glEnableVertexAttribArray(1)
+	gl.glVertexAttribPointer(
+		2, 1, gl.GL_FLOAT, gl.GL_FALSE, 7 * ctypes.sizeof(gl.GLfloat), 4 * ctypes.sizeof(gl.GLfloat)
+	)
+	gl.glEnableVertexAttribArray(2)
+	gl.glVertexAttribPointer(
+		3, 1, gl.GL_FLOAT, gl.GL_FALSE, 7 * ctypes.sizeof(gl.GLfloat), 5 * ctypes.sizeof(gl.GLfloat)
+	)
+	gl.glEnableVertexAttribArray(3)
+	gl.glVertexAttribPointer(
+		4, 1, gl.GL_FLOAT, gl.GL_FALSE, 7 * ctypes.sizeof(gl.GLfloat), 6 * ctypes.sizeof(gl.GLfloat)
+	)
+	gl.glEnableVertexAttribArray(4)
+
+
+def pack_vertices(mesh):
+	"""Packs the vertices of a mesh (a flat sequence of floats) into the compact layout, returns them as bytes"""
+
+	vertices = np.asarray(mesh, dtype=np.float64).reshape(-1, FLOAT_VERTEX_SIZE)
+
+	positions = np.rint((vertices[:, 0:3] + POSITION_OFFSET) * POSITION_SCALES).astype(np.uint32)
+	texture_fetchers = vertices[:, 3].astype(np.uint32)
+	shading = np.rint(vertices[:, 4] * SHADING_SCALE).astype(np.uint32)
+	lights = np.rint(vertices[:, 5:7] * LIGHT_SCALE).astype(np.uint32)
+
+	packed = np.empty((len(vertices), 2), dtype=np.uint32)
+	packed[:, 0] = positions[:, 0] | positions[:, 1] << 10 | positions[:, 2] << 22
+	packed[:, 1] = texture_fetchers | shading << 13 | lights[:, 0] << 19 | lights[:, 1] << 25
+
+	return packed.tobytes()
@@ -1,20 +1,27 @@
-import ctypes
+import bisect
 import math
 import logging
+import time
 import glm
-import options
 
-from functools import cmp_to_key
 from collections import deque
 
 import pyglet.gl as gl
 
 import block_type
+import buffer_pool
+import culling
+import index_buffer
+import mesh_workers
+import mesher
 import models
 import save
+import staging_buffer
+import world_buffer
 from util import DIRECTIONS
 
 from chunk import CHUNK_WIDTH, CHUNK_HEIGHT, CHUNK_LENGTH, Chunk
+from chunk_snapshot import Chunk_snapshot
 
 
 def get_chunk_position(position):
@@ -29,6 +36,50 @@ def get_local_position(position):
 	return glm.ivec3(int(x % CHUNK_WIDTH), int(y % CHUNK_HEIGHT), int(z % CHUNK_LENGTH))
 
 
+# Fast path for the hot block lookups, which only works with integer block coordinates
+# Chunk dimensions are powers of two, so chunk coordinates and local coordinates are just shifts and masks,
+# and chunks are looked up by a packed integer key rather than by a 'glm.ivec3' (which is slow to build & hash)
+
+CHUNK_WIDTH_SHIFT = CHUNK_WIDTH.bit_length() - 1
+CHUNK_HEIGHT_SHIFT = CHUNK_HEIGHT.bit_length() - 1
+CHUNK_LENGTH_SHIFT = CHUNK_LENGTH.bit_length() - 1
+
+CHUNK_KEY_BITS = 21  # per axis, so chunk coordinates wrap around after about a million chunks
+CHUNK_KEY_MASK = (1 << CHUNK_KEY_BITS) - 1
+
+
+def pack_chunk_position(chunk_position):
+	cx, cy, cz = chunk_position
+
+	return (
+		(cx & CHUNK_KEY_MASK) << (2 * CHUNK_KEY_BITS) | (cy & CHUNK_KEY_MASK) << CHUNK_KEY_BITS | (cz & CHUNK_KEY_MASK)
+	)
+
+
+def get_chunk_key(position):
+	x, y, z = position
+
+	return (
+		((x >> CHUNK_WIDTH_SHIFT) & CHUNK_KEY_MASK) << (2 * CHUNK_KEY_BITS)
+		| ((y >> CHUNK_HEIGHT_SHIFT) & CHUNK_KEY_MASK) << CHUNK_KEY_BITS
+		| ((z >> CHUNK_LENGTH_SHIFT) & CHUNK_KEY_MASK)
+	)
+
+
+def get_local_coordinates(position):
+	x, y, z = position
+
+	return x & (CHUNK_WIDTH - 1), y & (CHUNK_HEIGHT - 1), z & (CHUNK_LENGTH - 1)
+
+
+def get_local_index(position):
+	# index of a block in the block and light arrays of its chunk
+
+	x, y, z = position
+
+	return ((x & (CHUNK_WIDTH - 1)) * CHUNK_LENGTH + (z & (CHUNK_LENGTH - 1))) * CHUNK_HEIGHT + (y & (CHUNK_HEIGHT - 1))
+
+
 class World:
 	def __init__(self, shader, player, texture_manager, options):
 		self.options = options
@@ -47,6 +98,94 @@ class World:
 		self.get_chunk_position = get_chunk_position
 		self.get_local_position = get_local_position
 
+		self.load_block_types()
+
+		self.mesh_workers = mesh_workers.create_pool(self) if self.options.MESH_WORKERS else None
+
+		self.texture_manager.generate_mipmaps()
+
+		self.index_buffer = index_buffer.Index_buffer()
+
+		logging.debug("Created Shared Index Buffer")
+
+		# persistently mapped buffers need OpenGL 4.4, otherwise vertex data is uploaded with 'glBufferSubData'
+
+		self.staging_buffer = None
+
+		if self.options.STAGING_BUFFER and gl.gl_info.have_version(4, 4):
+			self.staging_buffer = staging_buffer.Staging_buffer()
+			logging.debug("Created Staging Buffer")
+
+		self.world_buffer = world_buffer.World_buffer(self) if self.options.WORLD_BUFFER else None
+		self.buffer_pool = buffer_pool.Buffer_pool()
+
+		# load the world
+
+		self.save = save.Save(self)
+
+		self.chunks = {}
+		self.chunk_keys = {}  # same chunks, but keyed by their packed position for the fast path
+		self.culler = culling.Chunk_culler(self.chunks)
+
+		# cache of the last chunk looked up, as consecutive lookups tend to fall in the same chunk
+
+		self.last_chunk_key = None
+		self.last_chunk = None
+		self.sorted_chunks = []
+
+		# light update queue
+
+		self.light_increase_queue = deque()  # Node: World Position, light
+		self.light_decrease_queue = deque()  # Node: World position, light
+		self.skylight_increase_queue = deque()
+		self.skylight_decrease_queue = deque()
+		self.chunk_building_queue = deque()
+
+		self.save.load()
+
+		logging.info("Lighting chunks")
+		for world_chunk in self.chunks.values():
+			self.init_skylight(world_chunk)
+
+		logging.info("Generating chunks")
+		for world_chunk in self.chunks.values():
+			world_chunk.update_subchunk_meshes()
+
+		self.visible_chunks = []
+		self.lod_chunk_position = None  # chunk the player was in when levels of detail were last updated
+
+		# Debug variables
+
+		self.pending_chunk_update_count = 0
+		self.chunk_update_counter = 0
+		self.uploaded_bytes = 0  # mesh data sent to the GPU this tick
+		self.culling_time = 0  # seconds spent culling chunks this frame
+
+	def __del__(self):
+		if self.mesh_workers:
+			self.mesh_workers.shutdown(wait=False, cancel_futures=True)
+
+		self.index_buffer.delete()
+
+		if self.staging_buffer:
+			self.staging_buffer.delete()
+
+		if self.world_buffer:
+			self.world_buffer.delete()
+
+		self.buffer_pool.delete()
+
+	def get_vertex_buffer_size(self):
+		# bytes of GPU memory taken by the buffers chunk meshes are uploaded to, whether they're filled or not
+
+		if self.world_buffer:
+			return self.world_buffer.vertices.get_size()
+
+		return self.buffer_pool.size
+
+	def load_block_types(self):
+		"""Parse the block type data file, and build everything derived from the block types"""
+
 		# parse block type data file
 
 		blocks_data_file = open("data/blocks.mcpy")
@@ -102,72 +241,55 @@ class World:
 
 		self.light_blocks = [10, 11, 50, 51, 62, 75]
 
-		self.texture_manager.generate_mipmaps()
-
-		indices = []
-
-		for nquad in range(CHUNK_WIDTH * CHUNK_HEIGHT * CHUNK_LENGTH * 8):
-			indices.append(4 * nquad + 0)
-			indices.append(4 * nquad + 1)
-			indices.append(4 * nquad + 2)
-			indices.append(4 * nquad + 2)
-			indices.append(4 * nquad + 3)
-			indices.append(4 * nquad + 0)
-
-		self.ibo = gl.GLuint(0)
-		gl.glGenBuffers(1, self.ibo)
-		gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.ibo)
-		gl.glBufferData(
-			gl.GL_ELEMENT_ARRAY_BUFFER,
-			ctypes.sizeof(gl.GLuint * len(indices)),
-			(gl.GLuint * len(indices))(*indices),
-			gl.GL_STATIC_DRAW,
-		)
-		gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, 0)
-
-		logging.debug("Created Shared Index Buffer")
-
-		# load the world
-
-		self.save = save.Save(self)
-
-		self.chunks = {}
-		self.sorted_chunks = []
-
-		# light update queue
-
-		self.light_increase_queue = deque()  # Node: World Position, light
-		self.light_decrease_queue = deque()  # Node: World position, light
-		self.skylight_increase_queue = deque()
-		self.skylight_decrease_queue = deque()
-		self.chunk_building_queue = deque()
-
-		self.save.load()
-
-		logging.info("Lighting chunks")
-		for world_chunk in self.chunks.values():
-			self.init_skylight(world_chunk)
-
-		logging.info("Generating chunks")
-		for world_chunk in self.chunks.values():
-			world_chunk.update_subchunk_meshes()
+		self.create_block_tables()
+		self.mesher = mesher.Mesher(self)
 
-		del indices
-		self.visible_chunks = []
+	def create_block_tables(self):
+		"""Lookup tables of block properties, indexed by block number
+		The hot paths (mesher, lighting engine, ...) read these instead of going through the block types' attributes"""
 
-		# Debug variables
+		block_transparency = bytearray([2] * 256)  # air & unknown blocks let light through entirely
+		opaque_blocks = bytearray(256)
+		cube_blocks = bytearray(256)
+		glass_blocks = bytearray(256)
+		translucent_blocks = bytearray(256)
+		light_source_blocks = bytearray(256)
 
-		self.pending_chunk_update_count = 0
-		self.chunk_update_counter = 0
+		for number, _block_type in enumerate(self.block_types):
+			if not _block_type:
+				continue
 
-	def __del__(self):
-		gl.glDeleteBuffers(1, ctypes.byref(self.ibo))
+			block_transparency[number] = _block_type.transparent
+			opaque_blocks[number] = not _block_type.transparent
+			cube_blocks[number] = _block_type.is_cube
+			glass_blocks[number] = _block_type.glass
+			translucent_blocks[number] = _block_type.translucent
+
+		for number in self.light_blocks:
+			light_source_blocks[number] = True
+
+		self.block_transparency = bytes(block_transparency)
+		self.opaque_blocks = bytes(opaque_blocks)
+		self.cube_blocks = bytes(cube_blocks)
+		self.glass_blocks = bytes(glass_blocks)
+		self.translucent_blocks = bytes(translucent_blocks)
+		self.light_source_blocks = bytes(light_source_blocks)
+
+		# whether a face of a block should be rendered against a given neighbouring block, indexed by
+		# (block number << 8) | neighbour number: faces are hidden by opaque neighbours, and glass-like blocks
+		# also hide the faces between themselves
+
+		self.face_visibility = bytes(
+			not (opaque_blocks[neighbour] or (glass_blocks[number] and neighbour == number))
+			for number in range(256)
+			for neighbour in range(256)
+		)
 
 	################ LIGHTING ENGINE ################
 
 	def increase_light(self, world_pos, newlight, light_update=True):
-		chunk = self.chunks[get_chunk_position(world_pos)]
-		local_pos = get_local_position(world_pos)
+		chunk = self.get_chunk(world_pos)
+		local_pos = get_local_coordinates(world_pos)
 
 		chunk.set_block_light(local_pos, newlight)
 
@@ -188,10 +310,10 @@ class World:
 			for direction in DIRECTIONS:
 				neighbour_pos = pos + direction
 
-				chunk = self.chunks.get(get_chunk_position(neighbour_pos), None)
+				chunk = self.get_chunk(neighbour_pos)
 				if not chunk:
 					continue
-				local_pos = get_local_position(neighbour_pos)
+				local_pos = get_local_coordinates(neighbour_pos)
 
 				if not self.is_opaque_block(neighbour_pos) and chunk.get_block_light(local_pos) + 2 <= light_level:
 					chunk.set_block_light(local_pos, light_level - 1)
@@ -211,22 +333,14 @@ class World:
 		chunk_pos = pending_chunk.chunk_position
 
 		# Retrieve the highest chunk point
-		height = 0
-		for lx in range(CHUNK_WIDTH):
-			for lz in range(CHUNK_LENGTH):
-				for ly in range(CHUNK_HEIGHT - 1, -1, -1):
-					if pending_chunk.blocks[lx][ly][lz]:
-						break
-				if ly > height:
-					height = ly
+		height = max(max(pending_chunk.heightmap) - 1, 0)
 
 		# Initialize skylight to 15 until that point and then queue a skylight propagation increase
+		pending_chunk.fill_sky_light(height + 1, 15)
+
 		for lx in range(CHUNK_WIDTH):
 			for lz in range(CHUNK_LENGTH):
-				for ly in range(CHUNK_HEIGHT - 1, height, -1):
-					pending_chunk.set_sky_light(glm.ivec3(lx, ly, lz), 15)
-
-				pos = glm.ivec3(CHUNK_WIDTH * chunk_pos[0] + lx, ly, CHUNK_LENGTH * chunk_pos[2] + lz)
+				pos = glm.ivec3(CHUNK_WIDTH * chunk_pos[0] + lx, height + 1, CHUNK_LENGTH * chunk_pos[2] + lz)
 				self.skylight_increase_queue.append((pos, 15))
 
 		self.propagate_skylight_increase(False)
@@ -242,10 +356,10 @@ class World:
 				if neighbour_pos.y > CHUNK_HEIGHT:
 					continue
 
-				_chunk = self.chunks.get(get_chunk_position(neighbour_pos), None)
+				_chunk = self.get_chunk(neighbour_pos)
 				if not _chunk:
 					continue
-				local_pos = get_local_position(neighbour_pos)
+				local_pos = get_local_coordinates(neighbour_pos)
 
 				transparency = self.get_transparency(neighbour_pos)
 
@@ -263,8 +377,8 @@ class World:
 						self.skylight_increase_queue.append((neighbour_pos, newlight - 1))
 
 	def decrease_light(self, world_pos):
-		chunk = self.chunks[get_chunk_position(world_pos)]
-		local_pos = get_local_position(world_pos)
+		chunk = self.get_chunk(world_pos)
+		local_pos = get_local_coordinates(world_pos)
 		old_light = chunk.get_block_light(local_pos)
 		chunk.set_block_light(local_pos, 0)
 		self.light_decrease_queue.append((world_pos, old_light))
@@ -285,12 +399,12 @@ class World:
 			for direction in DIRECTIONS:
 				neighbour_pos = pos + direction
 
-				chunk = self.chunks.get(get_chunk_position(neighbour_pos), None)
+				chunk = self.get_chunk(neighbour_pos)
 				if not chunk:
 					continue
-				local_pos = get_local_position(neighbour_pos)
+				local_pos = get_local_coordinates(neighbour_pos)
 
-				if self.get_block_number(neighbour_pos) in self.light_blocks:
+				if self.light_source_blocks[self.get_block_number(neighbour_pos)]:
 					self.light_increase_queue.append((neighbour_pos, 15))
 					continue
 
@@ -308,8 +422,8 @@ class World:
 						self.light_increase_queue.append((neighbour_pos, neighbour_level))
 
 	def decrease_skylight(self, world_pos, light_update=True):
-		chunk = self.chunks[get_chunk_position(world_pos)]
-		local_pos = get_local_position(world_pos)
+		chunk = self.get_chunk(world_pos)
+		local_pos = get_local_coordinates(world_pos)
 		old_light = chunk.get_sky_light(local_pos)
 		chunk.set_sky_light(local_pos, 0)
 		self.skylight_decrease_queue.append((world_pos, old_light))
@@ -326,10 +440,10 @@ class World:
 			for direction in DIRECTIONS:
 				neighbour_pos = pos + direction
 
-				chunk = self.chunks.get(get_chunk_position(neighbour_pos), None)
+				chunk = self.get_chunk(neighbour_pos)
 				if not chunk:
 					continue
-				local_pos = get_local_position(neighbour_pos)
+				local_pos = get_local_coordinates(neighbour_pos)
 
 				if self.get_transparency(neighbour_pos):
 					neighbour_level = chunk.get_sky_light(local_pos)
@@ -346,71 +460,110 @@ class World:
 
 	# Getter and setters
 
+	def get_chunk(self, position):
+		"""Chunk containing the block at 'position', None if it's not loaded"""
+
+		x, y, z = position
+
+		key = (
+			((x >> CHUNK_WIDTH_SHIFT) & CHUNK_KEY_MASK) << (2 * CHUNK_KEY_BITS)
+			| ((y >> CHUNK_HEIGHT_SHIFT) & CHUNK_KEY_MASK) << CHUNK_KEY_BITS
+			| ((z >> CHUNK_LENGTH_SHIFT) & CHUNK_KEY_MASK)
+		)  # same as 'get_chunk_key', inlined as this is the hottest path there is
+
+		if key != self.last_chunk_key:
+			self.last_chunk_key = key
+			self.last_chunk = self.chunk_keys.get(key, None)
+
+		return self.last_chunk
+
+	def add_chunk(self, chunk):
+		self.chunks[chunk.chunk_position] = chunk
+		self.chunk_keys[pack_chunk_position(chunk.chunk_position)] = chunk
+
+		self.last_chunk_key = None  # the cache may be holding a miss for this chunk
+
 	def get_raw_light(self, position):
-		chunk = self.chunks.get(get_chunk_position(position), None)
+		chunk = self.get_chunk(position)
 		if not chunk:
 			return 15 << 4
-		local_position = self.get_local_position(position)
-		return chunk.get_raw_light(local_position)
+		return chunk.lightmap[get_local_index(position)]
 
 	def get_light(self, position):
-		chunk = self.chunks.get(get_chunk_position(position), None)
+		chunk = self.get_chunk(position)
 		if not chunk:
 			return 0
-		local_position = self.get_local_position(position)
-		return chunk.get_block_light(local_position)
+		return chunk.lightmap[get_local_index(position)] & 0xF
 
 	def get_skylight(self, position):
-		chunk = self.chunks.get(get_chunk_position(position), None)
+		chunk = self.get_chunk(position)
 		if not chunk:
 			return 15
-		local_position = self.get_local_position(position)
-		return chunk.get_sky_light(local_position)
+		return chunk.lightmap[get_local_index(position)] >> 4
 
 	def set_light(self, position, light):
-		chunk = self.chunks.get(get_chunk_position(position), None)
-		local_position = get_local_position(position)
-		chunk.set_block_light(local_position, light)
+		chunk = self.get_chunk(position)
+		chunk.set_block_light(get_local_coordinates(position), light)
 
 	def set_skylight(self, position, light):
-		chunk = self.chunks.get(get_chunk_position(position), None)
-		local_position = get_local_position(position)
-		chunk.set_sky_light(local_position, light)
+		chunk = self.get_chunk(position)
+		chunk.set_sky_light(get_local_coordinates(position), light)
 
 	#################################################
 
 	def get_block_number(self, position):
-		chunk_position = get_chunk_position(position)
-
-		if chunk_position not in self.chunks:
+		chunk = self.get_chunk(position)
+		if not chunk:
 			return 0
 
-		lx, ly, lz = get_local_position(position)
+		return chunk.blocks[get_local_index(position)]
 
-		block_number = self.chunks[chunk_position].blocks[lx][ly][lz]
-		return block_number
+	def get_highest_block(self, x, z):
+		"""Height of the highest non-air block in the column at (x, z), -1 if there's none"""
 
-	def get_transparency(self, position):
-		block_type = self.block_types[self.get_block_number(position)]
+		chunk = self.get_chunk((x, 0, z))
+		if not chunk:
+			return -1
 
-		if not block_type:
-			return 2
+		lx, _, lz = get_local_coordinates((x, 0, z))
+		return chunk.heightmap[lx * CHUNK_LENGTH + lz] - 1
+
+	def get_highest_opaque_block(self, x, z):
+		"""Height of the highest opaque block in the column at (x, z), -1 if there's none"""
+
+		chunk = self.get_chunk((x, 0, z))
+		if not chunk:
+			return -1
 
-		return block_type.transparent
+		lx, _, lz = get_local_coordinates((x, 0, z))
+		return chunk.opaque_heightmap[lx * CHUNK_LENGTH + lz] - 1
+
+	def get_transparency(self, position):
+		return self.block_transparency[self.get_block_number(position)]
 
 	def is_opaque_block(self, position):
-		# get block type and check if it's opaque or not
-		# air counts as a transparent block, so test for that too
+		# air counts as a transparent block in the table, so no need to test for it
+		return self.opaque_blocks[self.get_block_number(position)]
+
+	def get_chunk_snapshot(self, chunk_position):
+		"""Padded copy of the blocks and light levels of the chunk at 'chunk_position' and of the blocks bordering it,
+		so that it can be processed without going through the world (see 'chunk_snapshot.py')"""
+
+		snapshot = Chunk_snapshot(chunk_position)
+		cx, cy, cz = chunk_position
 
-		block_type = self.block_types[self.get_block_number(position)]
+		for dx in (-1, 0, 1):
+			for dy in (-1, 0, 1):
+				for dz in (-1, 0, 1):
+					chunk = self.chunk_keys.get(pack_chunk_position((cx + dx, cy + dy, cz + dz)), None)
 
-		if not block_type:
-			return False
+					if chunk:
+						snapshot.copy_chunk(chunk, (dx, dy, dz))
 
-		return not block_type.transparent
+		return snapshot
 
 	def create_chunk(self, chunk_position):
-		self.chunks[chunk_position] = Chunk(self, chunk_position)
+		self.add_chunk(Chunk(self, chunk_position))
 		self.init_skylight(self.chunks[chunk_position])
 
 	def set_block(self, position, number):  # set number to 0 (air) to remove block
@@ -426,18 +579,18 @@ class World:
 		if self.get_block_number(position) == number:  # no point updating mesh if the block is the same
 			return
 
-		lx, ly, lz = get_local_position(position)
+		lx, ly, lz = local_position = get_local_position(position)
 
-		self.chunks[chunk_position].blocks[lx][ly][lz] = number
+		self.chunks[chunk_position].set_block_number(local_position, number)
 		self.chunks[chunk_position].modified = True
 
 		self.chunks[chunk_position].update_at_position((x, y, z))
 
 		if number:
-			if number in self.light_blocks:
+			if self.light_source_blocks[number]:
 				self.increase_light(position, 15)
 
-			elif self.block_types[number].transparent != 2:
+			elif self.block_transparency[number] != 2:
 				self.decrease_light(position)
 				self.decrease_skylight(position)
 
@@ -497,51 +650,74 @@ class World:
 			and math.dist(self.get_chunk_position(self.player.position), chunk_position) <= self.options.RENDER_DISTANCE
 		)
 
+	def get_lod(self, distance):
+		return min(bisect.bisect(self.options.LOD_DISTANCES, distance), mesher.MAX_LOD)
+
+	def update_chunk_lods(self):
+		"""Switch chunks to the level of detail of the ring of distances they're in, whenever the player changes chunk
+		Chunks only switch once they're 'LOD_HYSTERESIS' chunks past the edge of a ring, so that chunks along
+		the edge don't keep switching back and forth as the player moves around it"""
+
+		if not self.options.LOD_DISTANCES:
+			return
+
+		player_chunk_position = self.get_chunk_position(self.player.position)
+
+		if player_chunk_position == self.lod_chunk_position:
+			return
+
+		self.lod_chunk_position = player_chunk_position
+
+		for chunk in self.chunks.values():
+			distance = math.dist(player_chunk_position, chunk.chunk_position)
+
+			farther_lod = self.get_lod(distance - self.options.LOD_HYSTERESIS)
+			nearer_lod = self.get_lod(distance + self.options.LOD_HYSTERESIS)
+
+			if chunk.lod < farther_lod:
+				chunk.set_lod(farther_lod)
+
+			elif chunk.lod > nearer_lod:
+				chunk.set_lod(nearer_lod)
+
 	def prepare_rendering(self):
-		self.visible_chunks = [
-			self.chunks[chunk_position] for chunk_position in self.chunks if self.can_render_chunk(chunk_position)
-		]
-		self.sort_chunks()
-
-	def sort_chunks(self):
-		player_chunk_pos = self.get_chunk_position(self.player.position)
-		self.visible_chunks.sort(
-			key=cmp_to_key(
-				lambda a, b: math.dist(player_chunk_pos, a.chunk_position)
-				- math.dist(player_chunk_pos, b.chunk_position)
-			)
-		)
-		self.sorted_chunks = tuple(reversed(self.visible_chunks))
+		# chunks are only culled and ordered again when the camera moved enough, see 'culling'
 
-	def draw_translucent_fast(self):
-		gl.glEnable(gl.GL_BLEND)
-		gl.glDisable(gl.GL_CULL_FACE)
-		gl.glDepthMask(gl.GL_FALSE)
+		start = time.perf_counter()
 
-		for render_chunk in self.sorted_chunks:
-			render_chunk.draw_translucent(gl.GL_TRIANGLES)
+		if self.culler.cull(
+			self.player.get_frustum_planes(),
+			self.get_chunk_position(self.player.position),
+			self.options.RENDER_DISTANCE,
+		):
+			self.visible_chunks = self.culler.visible_chunks
+			self.sorted_chunks = tuple(reversed(self.visible_chunks))
 
-		gl.glDepthMask(gl.GL_TRUE)
-		gl.glEnable(gl.GL_CULL_FACE)
-		gl.glDisable(gl.GL_BLEND)
+		self.culling_time = time.perf_counter() - start
 
-	def draw_translucent_fancy(self):
-		gl.glDepthMask(gl.GL_FALSE)
-		gl.glFrontFace(gl.GL_CW)
-		gl.glEnable(gl.GL_BLEND)
+		if self.options.FANCY_TRANSLUCENCY:
+			camera_position = glm.vec3(*self.player.interpolated_position) + glm.vec3(0, self.player.eyelevel, 0)
 
-		for render_chunk in self.sorted_chunks:
-			render_chunk.draw_translucent(gl.GL_TRIANGLES)
+			for render_chunk in self.visible_chunks:
+				render_chunk.sort_translucent_quads(camera_position)
 
-		gl.glFrontFace(gl.GL_CCW)
+	def draw_translucent(self):
+		# with fancy translucency, chunks sort their translucent quads back to front, so that they blend correctly in
+		# a single pass (chunks themselves being drawn back to front)
 
-		for render_chunk in self.sorted_chunks:
-			render_chunk.draw_translucent(gl.GL_TRIANGLES)
+		gl.glEnable(gl.GL_BLEND)
+		gl.glDisable(gl.GL_CULL_FACE)
+		gl.glDepthMask(gl.GL_FALSE)
 
-		gl.glDisable(gl.GL_BLEND)
-		gl.glDepthMask(gl.GL_TRUE)
+		if self.world_buffer:
+			self.world_buffer.draw_translucent(gl.GL_TRIANGLES, self.sorted_chunks)
+		else:
+			for render_chunk in self.sorted_chunks:
+				render_chunk.draw_translucent(gl.GL_TRIANGLES)
 
-	draw_translucent = draw_translucent_fancy if options.FANCY_TRANSLUCENCY else draw_translucent_fast
+		gl.glDepthMask(gl.GL_TRUE)
+		gl.glEnable(gl.GL_CULL_FACE)
+		gl.glDisable(gl.GL_BLEND)
 
 	def draw(self):
 		self.c = 0
@@ -554,11 +730,17 @@ class World:
 		)
 		gl.glUniform1f(self.shader_daylight_location, daylight_multiplier)
 
-		for render_chunk in self.visible_chunks:
-			render_chunk.draw(gl.GL_TRIANGLES)
+		if self.world_buffer:
+			self.world_buffer.draw(gl.GL_TRIANGLES, self.visible_chunks)
+		else:
+			for render_chunk in self.visible_chunks:
+				render_chunk.draw(gl.GL_TRIANGLES)
 
 		self.draw_translucent()
 
+		if self.staging_buffer:
+			self.staging_buffer.end_frame()
+
 	def update_daylight(self):
 		if self.incrementer == -1:
 			if self.daylight < 480:  # Moonlight of 4
@@ -585,8 +767,10 @@ class World:
 
 	def tick(self, delta_time):
 		self.chunk_update_counter = 0
+		self.uploaded_bytes = 0
 		self.time += 1
 		self.pending_chunk_update_count = sum(len(chunk.chunk_update_queue) for chunk in self.chunks.values())
 		self.update_daylight()
+		self.update_chunk_lods()
 		self.build_pending_chunks()
 		self.process_chunk_updates()
@@ -0,0 +1,204 @@
+import ctypes
+
+import numpy as np
+import pyglet.gl as gl
+
+from buffer_allocator import Buffer_allocator
+import index_buffer
+import vertex_format
+
+# All chunk meshes in one large buffer, so that whole passes can be drawn with a single multi-draw call (OpenGL 4.3+)
+# Every chunk has a range of its own in it, and one draw command per pass, whose base instance is the index of its
+# position in a per-instance attribute, as a uniform can't change between the draws of a multi-draw call
+
+VERTEX_ARENA_CAPACITY = 1 << 16  # initial capacities, in quads
+INDEX_ARENA_CAPACITY = 1 << 14
+
+CHUNK_POSITION_LOCATION = 5
+
+
+class Arena:
+	"""Buffer suballocated in quads of 'quad_bytes' bytes, which grows when it's full
+	It keeps its name when it does, so that the VAOs (and chunks) referring to it don't have to be updated"""
+
+	def __init__(self, quad_bytes, capacity):
+		self.quad_bytes = quad_bytes
+		self.allocator = Buffer_allocator(capacity)
+
+		self.buffer = gl.GLuint(0)
+		gl.glGenBuffers(1, self.buffer)
+		gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, self.buffer)
+		gl.glBufferData(gl.GL_COPY_WRITE_BUFFER, capacity * quad_bytes, None, gl.GL_DYNAMIC_DRAW)
+
+	def delete(self):
+		gl.glDeleteBuffers(1, self.buffer)
+
+	def allocate(self, quad_count):
+		offset = self.allocator.allocate(quad_count)
+
+		if offset is None:
+			self.grow(1 << (self.allocator.capacity + quad_count - 1).bit_length())
+			offset = self.allocator.allocate(quad_count)
+
+		return offset
+
+	def get_size(self):
+		return self.allocator.capacity * self.quad_bytes
+
+	def free(self, offset, quad_count):
+		self.allocator.free(offset, quad_count)
+
+	def grow(self, capacity):
+		# move the contents out to a temporary buffer and back into the new storage
+
+		size = self.allocator.get_end() * self.quad_bytes
+
+		temporary_buffer = gl.GLuint(0)
+		gl.glGenBuffers(1, temporary_buffer)
+		gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, temporary_buffer)
+		gl.glBufferData(gl.GL_COPY_WRITE_BUFFER, size, None, gl.GL_STREAM_COPY)
+
+		gl.glBindBuffer(gl.GL_COPY_READ_BUFFER, self.buffer)
+		gl.glCopyBufferSubData(gl.GL_COPY_READ_BUFFER, gl.GL_COPY_WRITE_BUFFER, 0, 0, size)
+
+		gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, self.buffer)
+		gl.glBufferData(gl.GL_COPY_WRITE_BUFFER, capacity * self.quad_bytes, None, gl.GL_DYNAMIC_DRAW)
+
+		gl.glBindBuffer(gl.GL_COPY_READ_BUFFER, temporary_buffer)
+		gl.glCopyBufferSubData(gl.GL_COPY_READ_BUFFER, gl.GL_COPY_WRITE_BUFFER, 0, 0, size)
+
+		gl.glDeleteBuffers(1, temporary_buffer)
+		self.allocator.grow(capacity)
+
+	def upload(self, offset, data):
+		# 'data' being a numpy array, and 'offset' in quads
+
+		gl.glBindBuffer(gl.GL_COPY_WRITE_BUFFER, self.buffer)
+		gl.glBufferSubData(gl.GL_COPY_WRITE_BUFFER, offset * self.quad_bytes, data.nbytes, data.ctypes.data)
+
+
+class World_buffer:
+	def __init__(self, world):
+		self.world = world
+
+		self.vertices = Arena(4 * vertex_format.get_vertex_bytes(world.options), VERTEX_ARENA_CAPACITY)
+
+		self.chunk_position_buffer = gl.GLuint(0)
+		gl.glGenBuffers(1, self.chunk_position_buffer)
+
+		self.command_buffer = gl.GLuint(0)
+		gl.glGenBuffers(1, self.command_buffer)
+
+		self.vao = self.create_vao(world.index_buffer.buffer)
+
+		# with fancy translucency, the sorted indices of the translucent quads of every chunk are in an arena too,
+		# relative to the chunk's first vertex
+
+		if world.options.FANCY_TRANSLUCENCY:
+			self.translucent_indices = Arena(6 * ctypes.sizeof(gl.GLuint), INDEX_ARENA_CAPACITY)
+			self.translucent_vao = self.create_vao(self.translucent_indices.buffer)
+
+	def create_vao(self, ibo):
+		vao = gl.GLuint(0)
+		gl.glGenVertexArrays(1, vao)
+		gl.glBindVertexArray(vao)
+
+		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vertices.buffer)
+		vertex_format.set_vertex_attributes(self.world.options)
+
+		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.chunk_position_buffer)
+		gl.glVertexAttribIPointer(CHUNK_POSITION_LOCATION, 2, gl.GL_INT, 0, 0)
+		gl.glVertexAttribDivisor(CHUNK_POSITION_LOCATION, 1)
+		gl.glEnableVertexAttribArray(CHUNK_POSITION_LOCATION)
+
+		gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, ibo)
+		return vao
+
+	def delete(self):
+		gl.glDeleteVertexArrays(1, self.vao)
+		gl.glDeleteBuffers(1, self.chunk_position_buffer)
+		gl.glDeleteBuffers(1, self.command_buffer)
+		self.vertices.delete()
+
+		if self.world.options.FANCY_TRANSLUCENCY:
+			gl.glDeleteVertexArrays(1, self.translucent_vao)
+			self.translucent_indices.delete()
+
+	def multi_draw(self, vao, mode, index_type, chunks, commands):
+		# 'commands' being the count, first index and base vertex of each chunk's draw, in the same order as 'chunks'
+
+		if not commands:
+			return
+
+		chunk_positions = np.array([(chunk.chunk_position[0], chunk.chunk_position[2]) for chunk in chunks], np.int32)
+
+		commands = np.array(commands, dtype=np.uint32).reshape(-1, 3)
+		draw_commands = np.empty((len(commands), 5), dtype=np.uint32)
+
+		draw_commands[:, 0] = commands[:, 0]  # index count
+		draw_commands[:, 1] = 1  # instance count
+		draw_commands[:, 2:4] = commands[:, 1:3]  # first index and base vertex
+		draw_commands[:, 4] = np.arange(len(commands))  # base instance, selecting the chunk's position
+
+		gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.chunk_position_buffer)
+		gl.glBufferData(gl.GL_ARRAY_BUFFER, chunk_positions.nbytes, chunk_positions.ctypes.data, gl.GL_STREAM_DRAW)
+
+		gl.glBindBuffer(gl.GL_DRAW_INDIRECT_BUFFER, self.command_buffer)
+		gl.glBufferData(gl.GL_DRAW_INDIRECT_BUFFER, draw_commands.nbytes, draw_commands.ctypes.data, gl.GL_STREAM_DRAW)
+
+		gl.glBindVertexArray(vao)
+		gl.glMultiDrawElementsIndirect(mode, index_type, None, len(draw_commands), 0)
+
+	def get_index_type(self, chunks):
+		# all the draws of a call have to use the same type of shared indices, so 32-bit ones if any chunk needs them
+
+		if any(chunk.index_type == gl.GL_UNSIGNED_INT for chunk in chunks):
+			return gl.GL_UNSIGNED_INT
+
+		return gl.GL_UNSIGNED_SHORT
+
+	def draw(self, mode, chunks):
+		chunks = [chunk for chunk in chunks if chunk.mesh_quad_count]
+		index_type = self.get_index_type(chunks)
+		first_index = index_buffer.get_first_index(index_type)
+
+		# one command per chunk, or per range of visible sections for the chunks which are only partly visible
+
+		draw_chunks = []
+		commands = []
+
+		for chunk in chunks:
+			base_vertex = chunk.world_buffer_offset * 4
+
+			if chunk.visible_draw_ranges is None:
+				draw_chunks.append(chunk)
+				commands.append((chunk.mesh_quad_count * 6, first_index, base_vertex))
+				continue
+
+			for index_count, range_base_vertex in chunk.visible_draw_ranges:
+				draw_chunks.append(chunk)
+				commands.append((index_count, first_index, base_vertex + range_base_vertex))
+
+		self.multi_draw(self.vao, mode, index_type, draw_chunks, commands)
+
+	def draw_translucent(self, mode, chunks):
+		chunks = [chunk for chunk in chunks if chunk.translucent_quad_count]
+
+		if self.world.options.FANCY_TRANSLUCENCY:
+			commands = [
+				(chunk.translucent_quad_count * 6, chunk.translucent_index_offset * 6, chunk.world_buffer_offset * 4)
+				for chunk in chunks
+			]
+
+			self.multi_draw(self.translucent_vao, mode, gl.GL_UNSIGNED_INT, chunks, commands)
+			return
+
+		index_type = self.get_index_type(chunks)
+		first_index = index_buffer.get_first_index(index_type)
+
+		commands = [
+			(chunk.translucent_quad_count * 6, first_index, (chunk.world_buffer_offset + chunk.mesh_quad_count) * 4)
+			for chunk in chunks
+		]
+
+		self.multi_draw(self.vao, mode, index_type, chunks, commands)